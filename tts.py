@@ -9,23 +9,1837 @@ import time
 import configparser
 import hashlib
 import json
+import io
+import re
+import random
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pynput import keyboard
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_resample_tables = {}  # {(sr_in, sr_out): (up, down, offsets, weights)}
+
+def _resample_table(sr_in, sr_out, zero_crossings=16, beta=8.6):
+    """Return (up, down, tap offsets, per-phase weights) for a Kaiser-windowed sinc filter"""
+    import numpy as np
+    from math import gcd
+    
+    key = (sr_in, sr_out, zero_crossings, beta)
+    table = _resample_tables.get(key)
+    if table is None:
+        # One row of filter weights per output phase (the rate ratio is rational)
+        g = gcd(sr_in, sr_out)
+        up, down = sr_out // g, sr_in // g
+        scale = min(1.0, sr_out / sr_in)  # Lower the cutoff when downsampling
+        half_width = zero_crossings / scale
+        taps = int(np.ceil(half_width))
+        offsets = np.arange(-taps + 1, taps + 1)
+        phase = (np.arange(up) * down % up) / up
+        distance = phase[:, None] - offsets[None, :]
+        window = np.clip(1.0 - (distance / half_width) ** 2, 0.0, None)
+        weights = scale * np.sinc(scale * distance) * np.i0(beta * np.sqrt(window)) / np.i0(beta)
+        table = (up, down, offsets, weights.astype(np.float32))
+        _resample_tables[key] = table
+    return table
+
+def resample(data, sr_in, sr_out, zero_crossings=16, beta=8.6):
+    """Resample a mono float32 buffer with a Kaiser-windowed sinc filter"""
+    import numpy as np
+    
+    sr_in, sr_out = int(round(sr_in)), int(round(sr_out))
+    if sr_in == sr_out or len(data) == 0:
+        return data
+    
+    up, down, offsets, weights = _resample_table(sr_in, sr_out, zero_crossings, beta)
+    pad = len(offsets)
+    padded = np.concatenate([np.zeros(pad, np.float32), data.astype(np.float32, copy=False),
+                             np.zeros(pad, np.float32)])
+    out_len = int(len(data) * up // down)
+    out = np.empty(out_len, np.float32)
+    
+    # Work in chunks to keep the gather matrix small
+    chunk = 16384
+    for start in range(0, out_len, chunk):
+        n = np.arange(start, min(start + chunk, out_len))
+        base = n * down // up + pad
+        rows = padded[base[:, None] + offsets[None, :]]
+        out[start:start + len(n)] = np.einsum('ij,ij->i', rows, weights[n % up])
+    return out
+
+class StreamResampler:
+    """Block-by-block resample() that carries the filter history across blocks"""
+    def __init__(self, sr_in, sr_out):
+        import numpy as np
+        
+        self.sr_in, self.sr_out = int(round(sr_in)), int(round(sr_out))
+        self.up, self.down, self.offsets, self.weights = _resample_table(self.sr_in, self.sr_out)
+        self.taps = int(self.offsets[-1])
+        self.pad = len(self.offsets)
+        self.history = np.zeros(self.pad, np.float32)  # Zero-padded input from index self.start on
+        self.start = 0
+        self.next_out = 0
+        self.received = 0
+    
+    def process(self, block, final=False):
+        """Feed one block of input and return every output sample that is now complete"""
+        import numpy as np
+        
+        if self.sr_in == self.sr_out:
+            return block
+        
+        parts = [self.history, block.astype(np.float32, copy=False)]
+        self.received += len(block)
+        if final:
+            parts.append(np.zeros(self.pad, np.float32))
+        self.history = np.concatenate(parts)
+        
+        # Output n needs padded input up to n * down // up + pad + taps
+        last = self.start + len(self.history) - 1
+        limit = max(self.next_out, ((last - self.pad - self.taps + 1) * self.up + self.down - 1) // self.down)
+        if final:
+            limit = min(limit, self.received * self.up // self.down)
+        
+        n = np.arange(self.next_out, limit)
+        base = n * self.down // self.up + self.pad - self.start
+        rows = self.history[base[:, None] + self.offsets[None, :]]
+        out = np.einsum('ij,ij->i', rows, self.weights[n % self.up])
+        self.next_out = limit
+        
+        # Drop input the next output no longer reaches
+        keep_from = self.next_out * self.down // self.up + self.pad - self.taps + 1 - self.start
+        if keep_from > 0:
+            self.history = self.history[keep_from:]
+            self.start += keep_from
+        return out
+
+class StreamStretcher:
+    """Phase-vocoder time stretch fed block by block, carrying the phase and overlap-add state"""
+    def __init__(self, factor, n_fft=1024, hop=256):
+        import numpy as np
+        
+        self.factor, self.n_fft, self.hop = factor, n_fft, hop
+        self.window = np.hanning(n_fft + 1)[:n_fft].astype(np.float32)
+        self.window_sq = (self.window ** 2).reshape(n_fft // hop, hop)
+        self.omega = 2 * np.pi * hop * np.arange(n_fft // 2 + 1) / n_fft
+        # Input is zero-padded by n_fft in front; history holds it from index self.start on
+        self.history = np.zeros(n_fft, np.float32)
+        self.start = 0
+        self.spec = np.zeros((0, n_fft // 2 + 1), np.complex64)  # Analysis frames from spec_start on
+        self.spec_start = 0
+        self.next_frame = 0   # Next analysis frame to transform
+        self.next_out = 0     # Next output frame to synthesize
+        self.phase = None     # Synthesis phase of output frame next_out
+        self.ola = np.zeros(n_fft, np.float32)   # Unfinished overlap-add from output frame next_out on
+        self.norm = np.zeros(n_fft, np.float32)
+        self.received = 0
+        self.produced = 0     # Output samples produced, including the leading padding
+        self.skip = int(round(n_fft * factor))
+    
+    def process(self, block, final=False):
+        """Feed one block of input and return every output sample that is now complete"""
+        import numpy as np
+        
+        if self.factor == 1.0:
+            return block
+        n_fft, hop = self.n_fft, self.hop
+        
+        parts = [self.history, block.astype(np.float32, copy=False)]
+        self.received += len(block)
+        if final:
+            parts.append(np.zeros(n_fft + hop, np.float32))
+        self.history = np.concatenate(parts)
+        
+        # Analysis: every Hann-windowed frame that now lies fully inside the input
+        count = (self.start + len(self.history) - n_fft) // hop + 1 - self.next_frame
+        if count > 0:
+            first = self.next_frame * hop - self.start
+            frames = np.lib.stride_tricks.sliding_window_view(
+                self.history[first:first + (count - 1) * hop + n_fft], n_fft)[::hop]
+            spec = np.fft.rfft(frames * self.window, axis=1).astype(np.complex64)
+            self.spec = np.concatenate([self.spec, spec])
+            self.next_frame += count
+        
+        # Output frames read the input at fractional frame positions (and need the frame after)
+        t = np.arange(self.next_out, int((self.next_frame - 1) * self.factor) + 2)
+        steps = t * (1.0 / self.factor)
+        steps = steps[steps < self.next_frame - 1]
+        out = np.zeros(0, np.float32)
+        if len(steps):
+            out = self._synthesize(steps)
+        if final:
+            # Nothing else overlaps the tail
+            out = np.concatenate([out, self.ola / np.maximum(self.norm, 1e-3)])
+            self.ola = np.zeros(n_fft, np.float32)
+            self.norm = np.zeros(n_fft, np.float32)
+        
+        # Drop input and spectra no later frame reaches
+        keep_from = self.next_frame * hop - self.start
+        self.history = self.history[keep_from:]
+        self.start += keep_from
+        drop = int(self.next_out / self.factor) - self.spec_start
+        if drop > 0:
+            self.spec = self.spec[drop:]
+            self.spec_start += drop
+        
+        # Trim the leading padding and, at the end, the padding's tail
+        begin = self.produced
+        self.produced += len(out)
+        out = out[max(0, self.skip - begin):]
+        if final:
+            total = int(round(self.received * self.factor))
+            out = out[:max(0, total - max(0, begin - self.skip))]
+        return out
+    
+    def _synthesize(self, steps):
+        import numpy as np
+        
+        n_fft, hop = self.n_fft, self.hop
+        index = steps.astype(int)
+        frac = (steps - index)[:, None].astype(np.float32)
+        local = index - self.spec_start
+        current, following = self.spec[local], self.spec[local + 1]
+        mag = (1.0 - frac) * np.abs(current) + frac * np.abs(following)
+        phase_in = np.angle(current)
+        
+        # Phase vocoder: accumulate each bin's measured frequency over the output hops
+        delta = np.angle(following) - phase_in - self.omega
+        delta -= 2 * np.pi * np.round(delta / (2 * np.pi))
+        advance = self.omega + delta
+        if self.phase is None:
+            self.phase = phase_in[0]
+        phase = np.empty_like(mag)
+        phase[0] = self.phase
+        phase[1:] = self.phase + np.cumsum(advance, axis=0)[:-1]
+        self.phase = np.mod(phase[-1] + advance[-1], 2 * np.pi)
+        
+        # Identity phase locking: bins follow the phase of their nearest spectral peak
+        bins = np.arange(mag.shape[1])
+        peaks = np.zeros(mag.shape, bool)
+        peaks[:, 1:-1] = (mag[:, 1:-1] > mag[:, :-2]) & (mag[:, 1:-1] >= mag[:, 2:])
+        peaks[:, 0] = ~peaks.any(axis=1)  # Silent frames lock to DC
+        left = np.maximum.accumulate(np.where(peaks, bins, -1), axis=1)
+        right = np.minimum.accumulate(np.where(peaks, bins, len(bins))[:, ::-1], axis=1)[:, ::-1]
+        use_right = (left < 0) | ((right < len(bins)) & (right - bins < bins - left))
+        nearest = np.where(use_right, right, left)
+        rows = np.arange(len(mag))[:, None]
+        phase = phase[rows, nearest] + phase_in - phase_in[rows, nearest]
+        
+        # Synthesis: windowed overlap-add onto the carried tail, normalized by the window energy
+        out_frames = np.fft.irfft(mag * np.exp(1j * phase), n=n_fft, axis=1).astype(np.float32) * self.window
+        count = len(out_frames)
+        out = np.zeros(count * hop + n_fft, np.float32)
+        norm = np.zeros(count * hop + n_fft, np.float32)
+        out[:n_fft] = self.ola
+        norm[:n_fft] = self.norm
+        overlap = n_fft // hop
+        segments = out_frames.reshape(count, overlap, hop)
+        for k in range(overlap):
+            out[k * hop:k * hop + count * hop] += segments[:, k, :].ravel()
+            norm[k * hop:k * hop + count * hop] += np.tile(self.window_sq[k], count)
+        self.next_out += count
+        
+        # Samples before the next frame's start are final
+        done = count * hop
+        self.ola, self.norm = out[done:], norm[done:]
+        return out[:done] / np.maximum(norm[:done], 1e-3)
+
+class AudioTransformer:
+    """Rate and pitch change of a mono signal fed block by block (rate 2.0 = twice as fast)"""
+    def __init__(self, rate=1.0, semitones=0.0):
+        from fractions import Fraction
+        
+        # A small rational pitch factor keeps the resampler's filter table small
+        self.shift = Fraction(2 ** (semitones / 12)).limit_denominator(64) if semitones else Fraction(1)
+        self.stretcher = StreamStretcher(float(self.shift) / rate)
+        # Squeezing the stretched signal by the pitch factor restores its length and shifts the pitch
+        self.resampler = StreamResampler(self.shift.numerator, self.shift.denominator)
+    
+    def process(self, block, final=False):
+        return self.resampler.process(self.stretcher.process(block, final), final)
+
+def transform_file(src_path, dest_path, rate=1.0, semitones=0.0, block_frames=65536, cancel=None):
+    """Write a rate/pitch variant of an audio file as mono WAV, one block at a time; returns frames written"""
+    transformer = AudioTransformer(rate, semitones)
+    written = 0
+    with sf.SoundFile(src_path) as src:
+        with sf.SoundFile(dest_path, 'w', src.samplerate, 1, format='WAV') as dest:
+            while True:
+                if cancel is not None:
+                    cancel.check()
+                block = src.read(block_frames, dtype='float32', always_2d=True)
+                final = len(block) < block_frames
+                mono = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+                out = transformer.process(mono, final)
+                dest.write(out)
+                written += len(out)
+                if final:
+                    return written
+
+def crossfade_concat(parts, fade_frames):
+    """Join mono buffers end to start, overlapping each join with an equal-power crossfade"""
+    import numpy as np
+    
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return np.zeros(0, np.float32)
+    
+    # Each join overlaps by the fade length, shortened for very short parts
+    overlaps = [min(fade_frames, len(a), len(b)) for a, b in zip(parts, parts[1:])]
+    starts = [0]
+    for part, overlap in zip(parts, overlaps):
+        starts.append(starts[-1] + len(part) - overlap)
+    out = np.zeros(starts[-1] + len(parts[-1]), np.float32)
+    
+    for i, (part, start) in enumerate(zip(parts, starts)):
+        gain = np.ones(len(part), np.float32)
+        if i > 0 and overlaps[i - 1]:
+            n = overlaps[i - 1]
+            gain[:n] = np.sin(np.linspace(0.0, np.pi / 2, n, dtype=np.float32))
+        if i < len(overlaps) and overlaps[i]:
+            n = overlaps[i]
+            gain[-n:] *= np.cos(np.linspace(0.0, np.pi / 2, n, dtype=np.float32))
+        out[start:start + len(part)] += part * gain
+    return out
+
+def split_sentences(text):
+    """Split text into sentences (at . ! ? … followed by whitespace, and at line breaks)"""
+    return [s.strip() for s in re.split(r'(?<=[.!?…])\s+|\n+', text) if s.strip()]
+
+def design_fir(samplerate, response, taps=511):
+    """Design a linear-phase FIR whose magnitude follows response(freqs in Hz) -> linear gain"""
+    import numpy as np
+    
+    n_fft = max(4096, 1 << (taps - 1).bit_length() + 2)
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / samplerate)
+    # Zero-phase impulse, centred and windowed to the tap count
+    impulse = np.roll(np.fft.irfft(response(freqs), n_fft), taps // 2)[:taps]
+    return (impulse * np.kaiser(taps, 8.0)).astype(np.float32)
+
+class FFTConvolver:
+    """Streaming convolution with an impulse response, uniformly partitioned so a block's cost follows its size"""
+    # The IR's first partition is applied to each block directly (no added latency, any block size);
+    # the rest goes through a frequency-domain delay line, one partition of input at a time
+    def __init__(self, ir, partition=None):
+        import numpy as np
+        self.ir = np.asarray(ir, np.float32)
+        self.partition = partition  # Frames per partition (None = sized from the first block)
+        self.head_ir = None
+    
+    def _setup(self, partition):
+        import numpy as np
+        
+        self.partition = partition
+        self.head_ir = self.ir[:partition]
+        self.head_carry = np.zeros(len(self.head_ir) - 1, np.float32)  # Overlap-add into coming blocks
+        self._spectra = {}  # {fft size: head IR spectrum}
+        
+        tail = self.ir[partition:]
+        self.parts = -(-len(tail) // partition)
+        if self.parts:
+            padded = np.zeros(self.parts * partition, np.float32)
+            padded[:len(tail)] = tail
+            spectra = np.fft.rfft(padded.reshape(self.parts, partition), 2 * partition, axis=1)
+            self.tail_spectra = spectra[::-1].astype(np.complex64)  # Newest input meets partition 0
+            # Input spectra written twice so the last `parts` of them are always one contiguous slice
+            self.delay_line = np.zeros((2 * self.parts, partition + 1), np.complex64)
+            self.slot = 0
+            self.pending = np.zeros(0, np.float32)          # Input of the unfinished partition
+            self.previous = np.zeros(partition, np.float32)  # Last full partition (overlap-save)
+            self.tail_out = np.zeros(partition, np.float32)  # The IR tail starts one partition late
+    
+    def process(self, block):
+        if self.head_ir is None:
+            self._setup(self.partition or max(64, 1 << (len(block) - 1).bit_length()))
+        out = self._convolve_head(block)
+        if self.parts:
+            out += self._convolve_tail(block)
+        return out
+    
+    def _convolve_head(self, block):
+        import numpy as np
+        
+        n = len(block) + len(self.head_ir) - 1
+        size = 1 << (n - 1).bit_length()
+        spectrum = self._spectra.get(size)
+        if spectrum is None:
+            spectrum = self._spectra[size] = np.fft.rfft(self.head_ir, size)
+        full = np.fft.irfft(np.fft.rfft(block, size) * spectrum, size)[:n].astype(np.float32)
+        # The previous blocks' tails overlap the start of this one
+        full[:len(self.head_carry)] += self.head_carry
+        self.head_carry = full[len(block):]
+        return full[:len(block)]
+    
+    def _convolve_tail(self, block):
+        import numpy as np
+        
+        size = self.partition
+        pending = np.concatenate([self.pending, block.astype(np.float32, copy=False)])
+        ready = [self.tail_out]
+        complete = len(pending) // size
+        for i in range(complete):
+            chunk = pending[i * size:(i + 1) * size]
+            spectrum = np.fft.rfft(np.concatenate([self.previous, chunk]))
+            self.slot = (self.slot + 1) % self.parts
+            self.delay_line[self.slot] = self.delay_line[self.slot + self.parts] = spectrum
+            window = self.delay_line[self.slot + 1:self.slot + 1 + self.parts]
+            mixed = np.einsum('kb,kb->b', window, self.tail_spectra)
+            # Overlap-save: the second half is this partition's output, due one partition from now
+            ready.append(np.fft.irfft(mixed, 2 * size)[size:].astype(np.float32))
+            self.previous = chunk
+        self.pending = pending[complete * size:]
+        ready = np.concatenate(ready)
+        self.tail_out = ready[len(block):]
+        return ready[:len(block)]
+
+class EqualizerEffect:
+    """Three-band EQ (low shelf, mid peak, high shelf) as a linear-phase FIR"""
+    def __init__(self, samplerate, low_db=0.0, mid_db=0.0, high_db=0.0,
+                 low_hz=200.0, mid_hz=1500.0, high_hz=5000.0, taps=511):
+        import numpy as np
+        
+        def response(f):
+            f = np.maximum(f, 1.0)
+            gain_db = (low_db / (1.0 + (f / low_hz) ** 2) +
+                       mid_db * np.exp(-np.log2(f / mid_hz) ** 2 / 0.98) +
+                       high_db * (f / high_hz) ** 2 / (1.0 + (f / high_hz) ** 2))
+            return 10.0 ** (gain_db / 20.0)
+        
+        self.conv = FFTConvolver(design_fir(samplerate, response, taps))
+        self.latency = taps // 2
+        self.tail_frames = taps
+    
+    def process(self, block):
+        return self.conv.process(block)
+
+class CompressorEffect:
+    """Feed-forward compressor: gain computed once per block, ramped across it"""
+    def __init__(self, samplerate, threshold_db=-18.0, ratio=4.0, attack_ms=5.0, release_ms=120.0,
+                 makeup_db=0.0):
+        self.samplerate = samplerate
+        self.threshold_db = threshold_db
+        self.ratio = ratio
+        self.attack = attack_ms / 1000.0
+        self.release = release_ms / 1000.0
+        self.makeup = 10.0 ** (makeup_db / 20.0)
+        self.gain = 1.0
+        self.latency = 0
+        self.tail_frames = 0
+    
+    def process(self, block):
+        import numpy as np
+        
+        if not len(block):
+            return block
+        level = float(np.sqrt(np.mean(block * block)))
+        over = 20.0 * np.log10(max(level, 1e-9)) - self.threshold_db
+        target = 10.0 ** (-over * (1.0 - 1.0 / self.ratio) / 20.0) if over > 0 else 1.0
+        # One-pole smoothing at block rate: fast when clamping down, slow when letting go
+        tau = self.attack if target < self.gain else self.release
+        gain = target + (self.gain - target) * np.exp(-len(block) / self.samplerate / tau)
+        ramp = np.linspace(self.gain, gain, len(block), dtype=np.float32)
+        self.gain = gain
+        return block * ramp * self.makeup
+
+class ReverbEffect:
+    """Convolution reverb with a synthetic room or an impulse response file"""
+    def __init__(self, samplerate, seconds=0.8, mix=0.25, ir_file=''):
+        import numpy as np
+        
+        if ir_file:
+            ir, ir_rate = sf.read(ir_file, dtype='float32', always_2d=True)
+            ir = resample(ir.mean(axis=1), ir_rate, samplerate)
+        else:
+            # Exponentially decaying noise, 60 dB down after `seconds`
+            n = max(1, int(seconds * samplerate))
+            decay = np.exp(-6.9 * np.arange(n) / n)
+            ir = np.random.default_rng(1).standard_normal(n) * decay
+        ir = ir / max(float(np.sqrt(np.sum(ir * ir))), 1e-9)
+        self.conv = FFTConvolver(ir)
+        self.mix = mix
+        self.latency = 0
+        self.tail_frames = len(ir)
+    
+    def process(self, block):
+        return block * (1.0 - self.mix) + self.conv.process(block) * self.mix
+
+class RadioEffect:
+    """Radio/telephone voice: band-pass filter plus soft saturation"""
+    def __init__(self, samplerate, low_hz=300.0, high_hz=3400.0, drive=3.0, taps=511):
+        self.conv = FFTConvolver(design_fir(
+            samplerate, lambda f: ((f >= low_hz) & (f <= high_hz)).astype(float), taps))
+        self.drive = drive
+        self.latency = taps // 2
+        self.tail_frames = taps
+    
+    def process(self, block):
+        import numpy as np
+        # Unity gain for quiet passages, peaks squashed
+        return np.tanh(self.conv.process(block) * self.drive) / self.drive
+
+class EffectsChain:
+    """Effects applied in order to each output block of one device"""
+    EFFECTS = {
+        'eq': EqualizerEffect,
+        'compressor': CompressorEffect,
+        'radio': RadioEffect,
+        'reverb': ReverbEffect
+    }
+    
+    def __init__(self, effects):
+        self.effects = effects
+        self.latency = sum(effect.latency for effect in effects)  # Frames of filter delay
+        self.tail_frames = sum(effect.tail_frames for effect in effects)  # Frames to ring out
+    
+    @classmethod
+    def build(cls, names, samplerate, params=None):
+        """Create a chain from effect names (in EFFECTS order) and {name: keyword args}"""
+        params = params or {}
+        return cls([cls.EFFECTS[name](samplerate, **params.get(name, {}))
+                    for name in cls.EFFECTS if name in names])
+    
+    def process(self, block):
+        for effect in self.effects:
+            block = effect.process(block)
+        return block
+
+# Cache files are shared by every app instance using the folder: writers stage
+# into a temp file and rename it into place, and hold a per-entry lock file
+class FileLock:
+    """Exclusive lock shared across processes, held on a lock file"""
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.timeout = timeout  # Seconds to wait (None = forever)
+        self._file = None
+    
+    def acquire(self, cancel=None):
+        """Wait for the lock; False if the timeout ran out first"""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        self._file = open(self.path, 'a+b')
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._file.close()
+                    self._file = None
+                    return False
+                if cancel is not None and cancel.wait(0.05):
+                    self._file.close()
+                    self._file = None
+                    cancel.check()
+                time.sleep(0.05)
+    
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"timed out waiting for {self.path}")
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+@contextmanager
+def atomic_path(path):
+    """Yield a temp path beside path; it replaces path only if the block succeeds"""
+    folder, name = os.path.split(path)
+    # Unique per writer; created by the caller so it gets the usual file permissions
+    temp_path = os.path.join(folder, f".{name}.{os.getpid()}-{os.urandom(4).hex()}.part")
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def atomic_write(path, data):
+    """Write bytes so readers only ever see the old file or the complete new one"""
+    with atomic_path(path) as temp_path:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+def is_valid_audio(path, tail_frames=1024):
+    """Check an audio file opens and decodes through to its last frames"""
+    try:
+        if os.path.getsize(path) == 0:
+            return False
+        with sf.SoundFile(path) as f:
+            if f.frames <= 0:
+                return False
+            if not f.seekable():
+                return True
+            # Truncated files still report the full length but have nothing at the end
+            f.seek(max(0, f.frames - tail_frames))
+            return len(f.read(tail_frames, dtype='float32')) > 0
+    except Exception:
+        return False
+
+def remove_stale_parts(folder, max_age=3600):
+    """Delete temp files left behind by writers that crashed (older than max_age seconds)"""
+    removed = 0
+    for name in os.listdir(folder):
+        if not name.endswith('.part'):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            if time.time() - os.path.getmtime(path) > max_age:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+# Waveform thumbnails: one bar per column, from the clip's RMS level
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+
+def compute_peaks(data, samplerate, base=256, min_buckets=32):
+    """Summarize a clip as per-bucket peak/RMS levels, halving the resolution per level down to min_buckets"""
+    import numpy as np
+    
+    data = np.abs(np.asarray(data, dtype=np.float32))
+    count = max(1, -(-len(data) // base))
+    blocks = np.zeros(count * base, np.float32)
+    blocks[:len(data)] = data
+    blocks = blocks.reshape(count, base)
+    peak = blocks.max(axis=1)
+    power = np.einsum('ij,ij->i', blocks, blocks) / base
+    
+    summary = {'frames': len(data), 'samplerate': samplerate, 'base': base}
+    level = 0
+    while True:
+        # Stored as uint8 (full scale = 255): a minute of speech is a few KB
+        summary[f'peak{level}'] = np.minimum(np.round(peak * 255), 255).astype(np.uint8)
+        summary[f'rms{level}'] = np.minimum(np.round(np.sqrt(power) * 255), 255).astype(np.uint8)
+        if len(peak) <= min_buckets:
+            break
+        if len(peak) % 2:
+            peak = np.append(peak, 0.0)
+            power = np.append(power, 0.0)
+        peak = peak.reshape(-1, 2).max(axis=1)
+        power = power.reshape(-1, 2).mean(axis=1)
+        level += 1
+    summary['levels'] = level + 1
+    return summary
+
+def save_peaks(path, data, samplerate):
+    """Compute a clip's peak summary and write it as an .npz sidecar"""
+    import numpy as np
+    
+    summary = compute_peaks(data, samplerate)
+    with atomic_path(path) as temp_path:
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **summary)
+
+def peak_sparkline(path, width=24, floor_db=-48.0):
+    """Draw a peak sidecar as a row of block characters; returns (sparkline, duration in seconds)"""
+    import numpy as np
+    
+    with np.load(path) as summary:
+        frames = int(summary['frames'])
+        samplerate = int(summary['samplerate'])
+        # Only the coarsest level that still has a bucket per column is read
+        buckets = max(1, -(-frames // int(summary['base'])))
+        level = int(np.clip(np.floor(np.log2(max(buckets / width, 1))), 0, int(summary['levels']) - 1))
+        rms = summary[f'rms{level}'].astype(np.float32) / 255
+    
+    if len(rms) > width:
+        edges = np.linspace(0, len(rms), width + 1).astype(int)[:-1]
+        rms = np.maximum.reduceat(rms, edges)
+    db = 20 * np.log10(np.maximum(rms, 1e-6))
+    steps = np.clip((db - floor_db) / -floor_db * len(SPARK_BARS), 0, len(SPARK_BARS) - 1).astype(int)
+    return "".join(SPARK_BARS[i] for i in steps), frames / max(samplerate, 1)
+
+# Library import: accepted source files and the sample rates MP3 can store
+IMPORT_EXTENSIONS = ('.wav', '.flac', '.ogg', '.oga', '.opus', '.mp3', '.aif', '.aiff')
+MP3_SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+_import_known_hashes = frozenset()
+
+def _init_import_worker(known_hashes):
+    """Give each import worker process the content hashes already in the cache"""
+    global _import_known_hashes
+    _import_known_hashes = known_hashes
+
+def file_hash(path):
+    """Return the SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _import_audio_file(src_path, dest_path, peaks_path=None, lock_path=None, planned_mtime=None,
+                       lock_timeout=60.0, peak=0.89):
+    """Decode, downmix, normalize and transcode one file into the cache (runs in a worker process)"""
+    import numpy as np
+    
+    result = {'source': src_path, 'file': os.path.basename(dest_path), 'status': 'failed'}
+    lock = FileLock(lock_path, timeout=lock_timeout) if lock_path else None
+    try:
+        result['bytes'] = os.path.getsize(src_path)
+        result['hash'] = file_hash(src_path)
+        if result['hash'] in _import_known_hashes:
+            result['status'] = 'skipped'
+            return result
+        
+        # Another instance importing the same library writes the same entry: wait for it
+        if lock and not lock.acquire():
+            lock = None
+        try:
+            mtime = os.stat(dest_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != planned_mtime and is_valid_audio(dest_path):
+            result['status'] = 'skipped'
+            return result
+        
+        data, sr = sf.read(src_path, dtype='float32', always_2d=True)
+        data = data.mean(axis=1)
+        
+        # Peak-normalize to -1 dBFS
+        level = float(np.abs(data).max()) if len(data) else 0.0
+        if level > 0:
+            data *= peak / level
+        
+        if sr not in MP3_SAMPLE_RATES:
+            target = min([r for r in MP3_SAMPLE_RATES if r >= sr] or [48000])
+            data = resample(data, sr, target)
+            sr = target
+        
+        with atomic_path(dest_path) as temp_path:
+            sf.write(temp_path, data, sr, format='MP3')
+        if peaks_path:
+            save_peaks(peaks_path, data, sr)
+        result.update(status='imported', duration=len(data) / sr, samplerate=sr)
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        if lock:
+            lock.release()
+    return result
+
+class _NullSpan:
+    """Span stand-in used while tracing is disabled"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, **attrs):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    """Timed section of a speech request"""
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = None
+        self.parent = None
+        self.start = 0.0
+        self.duration_ms = 0.0
+    
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.parent = stack[-1].name
+            self.trace_id = stack[-1].trace_id
+        else:
+            self.trace_id = self.tracer._next_trace_id()
+        stack.append(self)
+        self.wall_time = time.time()
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000.0
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.record(self.name, self.duration_ms, trace=self.trace_id,
+                           parent=self.parent, ts=self.wall_time, **self.attrs)
+        return False
+    
+    def set(self, **attrs):
+        """Attach extra attributes (cache hit, device, ...) to the span"""
+        self.attrs.update(attrs)
+    
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000.0
+
+class Tracer:
+    """Span tracer exporting to a rolling JSON-lines log and keeping latency history"""
+    def __init__(self, log_file, max_bytes=1_000_000, backups=3, history=1000):
+        self.enabled = False
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.history = history
+        self._durations = {}  # {span name: deque of durations in ms}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._trace_counter = 0
+        self._log = None
+    
+    def span(self, name, **attrs):
+        """Return a context manager timing one stage; free when disabled"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+    
+    def current(self):
+        """Return the innermost open span on this thread (or the null span)"""
+        stack = self._stack()
+        return stack[-1] if stack else NULL_SPAN
+    
+    def record(self, name, duration_ms, **attrs):
+        """Record a finished measurement and append it to the log"""
+        if not self.enabled:
+            return
+        entry = {'span': name, 'ms': round(duration_ms, 3)}
+        entry.update({k: v for k, v in attrs.items() if v is not None})
+        entry.setdefault('ts', time.time())
+        with self._lock:
+            samples = self._durations.get(name)
+            if samples is None:
+                samples = self._durations[name] = deque(maxlen=self.history)
+            samples.append(duration_ms)
+            try:
+                self._write(json.dumps(entry, default=str))
+            except Exception as e:
+                print(f"Error writing trace log: {e}")
+    
+    def stats(self):
+        """Return {span name: {count, p50, p90, p99, max}} in milliseconds"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._durations.items()}
+        result = {}
+        for name, values in snapshot.items():
+            if not values:
+                continue
+            result[name] = {
+                'count': len(values),
+                'p50': self._percentile(values, 50),
+                'p90': self._percentile(values, 90),
+                'p99': self._percentile(values, 99),
+                'max': values[-1]
+            }
+        return result
+    
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+    
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+    
+    @staticmethod
+    def _percentile(sorted_values, pct):
+        # Nearest-rank percentile
+        rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+        return sorted_values[min(rank, len(sorted_values)) - 1]
+    
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def _next_trace_id(self):
+        with self._lock:
+            self._trace_counter += 1
+            return f"{os.getpid():x}-{self._trace_counter}"
+    
+    def _write(self, line):
+        if self._log is None:
+            self._log = open(self.log_file, 'a', encoding='utf-8')
+        self._log.write(line + "\n")
+        self._log.flush()
+        if self._log.tell() >= self.max_bytes:
+            self._rotate()
+    
+    def _rotate(self):
+        self._log.close()
+        self._log = None
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.log_file}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_file}.{i + 1}")
+        os.replace(self.log_file, f"{self.log_file}.1")
+
+class ProfileSection:
+    """CPU time of one section on its thread, plus the traced memory it left behind"""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+    
+    def __enter__(self):
+        self.memory = tracemalloc.get_traced_memory()[0]
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        cpu = time.thread_time() - self.cpu
+        wall = time.perf_counter() - self.wall
+        # Traced memory is process-wide, so concurrent sections share each other's allocations
+        memory = tracemalloc.get_traced_memory()[0] - self.memory
+        self.profiler.record(self.name, cpu, wall, memory)
+        return False
+    
+    def set(self, **attrs):
+        pass
+
+class Profiler:
+    """Opt-in memory/CPU profiler: tracemalloc snapshot diffs, per-section thread CPU time and thread counts"""
+    def __init__(self, report_file, interval=60.0, top=10, frames=8, max_bytes=1_000_000):
+        self.enabled = False
+        self.report_file = report_file
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.max_bytes = max_bytes
+        self._sections = {}  # {section name: {count, cpu, cpu_max, wall, memory}}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started_tracing = False
+        self._baseline = None
+        self._previous = None
+        self._started = 0.0
+        self.thread_peak = 0
+    
+    def start(self):
+        """Start tracing allocations and writing a report every interval seconds"""
+        if self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._baseline = self._previous = self._snapshot()
+        self._started = time.time()
+        self._stop = threading.Event()
+        self.enabled = True
+        threading.Thread(target=self._report_loop, args=(self._stop,), name="profiler", daemon=True).start()
+    
+    def stop(self):
+        """Write a last report and stop tracing"""
+        if not self.enabled:
+            return
+        self.write_report()
+        self.enabled = False
+        self._stop.set()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = self._previous = None
+    
+    def section(self, name):
+        """Return a context manager measuring one section; free when disabled"""
+        if not self.enabled:
+            return NULL_SPAN
+        return ProfileSection(self, name)
+    
+    def record(self, name, cpu, wall, memory):
+        with self._lock:
+            st = self._sections.get(name)
+            if st is None:
+                st = self._sections[name] = {'count': 0, 'cpu': 0.0, 'cpu_max': 0.0, 'wall': 0.0, 'memory': 0}
+            st['count'] += 1
+            st['cpu'] += cpu
+            st['cpu_max'] = max(st['cpu_max'], cpu)
+            st['wall'] += wall
+            st['memory'] += memory
+    
+    def reset(self):
+        with self._lock:
+            self._sections.clear()
+        self.thread_peak = 0
+    
+    def thread_counts(self):
+        """Return {thread group: live threads}, grouping workers by their target function"""
+        counts = {}
+        for thread in threading.enumerate():
+            match = re.match(r'^Thread-\d+ \((.+)\)$', thread.name)
+            group = match.group(1) if match else re.sub(r'-\d+$', '', thread.name)
+            counts[group] = counts.get(group, 0) + 1
+        self.thread_peak = max(self.thread_peak, sum(counts.values()))
+        return counts
+    
+    def summary(self):
+        """Return the memory, thread and section lines of a report"""
+        current, peak = tracemalloc.get_traced_memory()
+        counts = self.thread_counts()
+        
+        lines = [f"  traced memory {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)"
+                 f"  process CPU {time.process_time():.1f}s"]
+        lines.append(f"  threads {sum(counts.values())} (peak {self.thread_peak}): "
+                     + ", ".join(f"{name} {n}" for name, n in sorted(counts.items(), key=lambda c: -c[1])))
+        
+        with self._lock:
+            sections = {name: dict(st) for name, st in self._sections.items()}
+        lines.append(f"  {'section':<14}{'count':>6}{'cpu avg':>10}{'cpu max':>10}{'wall avg':>10}{'memory':>10}")
+        for name, st in sorted(sections.items()):
+            lines.append(
+                f"  {name:<14}{st['count']:>6}{st['cpu'] / st['count'] * 1000:>8.1f}ms"
+                f"{st['cpu_max'] * 1000:>8.1f}ms{st['wall'] / st['count'] * 1000:>8.1f}ms"
+                f"{st['memory'] / 1e6:>+8.2f}MB"
+            )
+        return lines
+    
+    def report(self):
+        """Build a full report and advance the "since last report" snapshot"""
+        snapshot = self._snapshot()
+        lines = [f"Profile {time.strftime('%Y-%m-%d %H:%M:%S')} (up {time.time() - self._started:.0f}s)"]
+        lines.extend(self.summary())
+        for title, base in (("since last report", self._previous), ("since profiling started", self._baseline)):
+            lines.append(f"  Allocation growth {title}")
+            for stat in snapshot.compare_to(base, 'lineno')[:self.top]:
+                if stat.size_diff <= 0:
+                    break
+                frame = stat.traceback[0]
+                lines.append(f"    {os.path.basename(frame.filename)}:{frame.lineno}"
+                             f"  {stat.size_diff / 1e3:+.1f} KB ({stat.count_diff:+d} blocks,"
+                             f" {stat.size / 1e3:.1f} KB live)")
+        self._previous = snapshot
+        return "\n".join(lines)
+    
+    def write_report(self):
+        """Append a report to the report file (keeping one rotated backup)"""
+        try:
+            text = self.report()
+            if os.path.exists(self.report_file) and os.path.getsize(self.report_file) >= self.max_bytes:
+                os.replace(self.report_file, self.report_file + ".1")
+            with open(self.report_file, 'a', encoding='utf-8') as f:
+                f.write(text + "\n\n")
+        except Exception as e:
+            print(f"Error writing profile report: {e}")
+    
+    def _snapshot(self):
+        # The profiler's own and the import machinery's allocations are noise
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+    
+    def _report_loop(self, stop):
+        while not stop.wait(self.interval):
+            self.thread_counts()
+            self.write_report()
+
+class DeviceStats:
+    """Output health counters for one device, updated from its audio callback"""
+    def __init__(self, device, name):
+        self.device = device
+        self.name = name
+        self.streams = 0
+        self.callbacks = 0
+        self.frames = 0
+        self.underflows = 0
+        self.overflows = 0
+        self.callback_ms_total = 0.0
+        self.callback_ms_max = 0.0
+        self.callback_ms = deque(maxlen=512)
+        self.block_min = 0
+        self.block_max = 0
+        self.block_last = 0
+        self.samplerate = 0
+        self.channels = 0
+        self.blocksize = 0
+        self.latency_requested = None
+        self.latency_reported = 0.0
+        self.dac_latency_last = 0.0
+        self.dac_latency_max = 0.0
+        self.sync_lead_ms = 0.0
+        self.drift_ms = 0.0
+        self.drift_ms_max = 0.0
+        self.drift_corrections = 0
+        self.starved = 0
+        self.effects = ''
+        self.effects_blocks = 0
+        self.effects_ms_total = 0.0
+        self.effects_ms_max = 0.0
+        self.effects_load_max = 0.0  # Largest share of a block's duration spent on effects
+    
+    def on_stream_open(self, stream, blocksize, latency):
+        self.streams += 1
+        self.samplerate = stream.samplerate
+        self.channels = stream.channels
+        self.blocksize = blocksize
+        self.latency_requested = latency
+        self.latency_reported = stream.latency
+    
+    def on_effects(self, frames, duration_ms):
+        self.effects_blocks += 1
+        self.effects_ms_total += duration_ms
+        if duration_ms > self.effects_ms_max:
+            self.effects_ms_max = duration_ms
+        load = duration_ms / (frames * 1000.0 / self.samplerate) if frames and self.samplerate else 0.0
+        if load > self.effects_load_max:
+            self.effects_load_max = load
+    
+    def on_callback(self, frames, time_info, status, duration_ms):
+        self.callbacks += 1
+        self.frames += frames
+        if status.output_underflow:
+            self.underflows += 1
+        if status.output_overflow:
+            self.overflows += 1
+        self.callback_ms_total += duration_ms
+        if duration_ms > self.callback_ms_max:
+            self.callback_ms_max = duration_ms
+        self.callback_ms.append(duration_ms)
+        if self.block_min == 0 or frames < self.block_min:
+            self.block_min = frames
+        if frames > self.block_max:
+            self.block_max = frames
+        self.block_last = frames
+        # Time until this block reaches the DAC (0 on host APIs that don't report it)
+        dac_latency = time_info.outputBufferDacTime - time_info.currentTime
+        if dac_latency > 0:
+            self.dac_latency_last = dac_latency
+            if dac_latency > self.dac_latency_max:
+                self.dac_latency_max = dac_latency
+    
+    def snapshot(self):
+        """Return a plain dict of the current counters"""
+        recent = sorted(self.callback_ms)
+        return {
+            'device': self.device,
+            'name': self.name,
+            'streams': self.streams,
+            'callbacks': self.callbacks,
+            'frames': self.frames,
+            'underflows': self.underflows,
+            'overflows': self.overflows,
+            'callback_ms_avg': self.callback_ms_total / self.callbacks if self.callbacks else 0.0,
+            'callback_ms_p99': recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0,
+            'callback_ms_max': self.callback_ms_max,
+            'block_min': self.block_min,
+            'block_max': self.block_max,
+            'block_last': self.block_last,
+            'samplerate': self.samplerate,
+            'channels': self.channels,
+            'blocksize': self.blocksize,
+            'latency_requested': self.latency_requested,
+            'latency_reported_ms': self.latency_reported * 1000.0,
+            'dac_latency_ms': self.dac_latency_last * 1000.0,
+            'dac_latency_max_ms': self.dac_latency_max * 1000.0,
+            'sync_lead_ms': self.sync_lead_ms,
+            'drift_ms': self.drift_ms,
+            'drift_ms_max': self.drift_ms_max,
+            'drift_corrections': self.drift_corrections,
+            'starved': self.starved,
+            'effects': self.effects,
+            'effects_blocks': self.effects_blocks,
+            'effects_ms_avg': self.effects_ms_total / self.effects_blocks if self.effects_blocks else 0.0,
+            'effects_ms_max': self.effects_ms_max,
+            'effects_load_max': self.effects_load_max
+        }
+
+class DeviceOutput:
+    """Callback-driven output stream playing queued mono buffers back to back on one device"""
+    # Smoothed drift tolerated before a one-frame correction
+    DRIFT_TOLERANCE_MS = 0.5
+    
+    def __init__(self, device, data, samplerate, channels, stats, blocksize=0, latency=None, tag=None,
+                 effects=None):
+        self.device = device
+        self.data = data
+        self.tag = tag
+        self.samplerate = samplerate
+        self.stats = stats
+        self.position = 0
+        self.consumed = 0       # Frames of buffers already played
+        self.buffers = deque()  # [(data, tag)] waiting to follow the current buffer
+        self.tag_position = 0   # Frames played since the current tag started
+        self.input_open = False  # More buffers are on the way (streamed clip)
+        self.ended = False
+        self.effects = effects  # EffectsChain, or None for a dry output
+        self.tail_left = None   # Frames of effect tail still to play after the last buffer
+        self._lock = threading.Lock()
+        self.first_callback = None  # (perf_counter, seconds until DAC) of the first audible block
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        
+        # Synchronized start (see AudioPlayer.play)
+        self.sync_start = None  # Stream time at which frame 0 must reach the DAC
+        self.lead_frames = 0    # Fallback silence when the host reports no DAC times
+        self.audio_started = False
+        self.drift = 0.0
+        self.drift_tolerance = self.DRIFT_TOLERANCE_MS * samplerate / 1000.0
+        self.stream = sd.OutputStream(
+            device=device,
+            samplerate=samplerate,
+            channels=channels,
+            dtype='float32',
+            blocksize=blocksize,
+            latency=latency,
+            callback=self._callback,
+            finished_callback=self.finished.set
+        )
+        stats.on_stream_open(self.stream, blocksize, latency)
+    
+    def _callback(self, outdata, frames, time_info, status):
+        started = time.perf_counter()
+        
+        offset = 0
+        if not self.audio_started:
+            offset = self._sync(frames, time_info)
+            if self.audio_started:
+                dac_latency = max(0.0, time_info.outputBufferDacTime - time_info.currentTime)
+                self.first_callback = (started, dac_latency + offset / self.samplerate)
+                self.started.set()
+        elif self.sync_start is not None and not self.ended and self.tail_left is None:
+            # Once the audio has run out only the effects tail plays, with nothing to keep in step
+            self._correct_drift(time_info)
+        if offset:
+            outdata[:offset] = 0
+        
+        while offset < frames:
+            chunk = self.data[self.position:self.position + frames - offset]
+            count = len(chunk)
+            # Mono source is broadcast to every output channel
+            outdata[offset:offset + count] = chunk[:, None]
+            self.position += count
+            self.tag_position += count
+            offset += count
+            if offset < frames:
+                # Move straight on to the next queued buffer, without a gap
+                more = self._next_buffer()
+                if more is None:
+                    # Streamed clip fell behind: fill with silence and keep the stream alive
+                    outdata[offset:] = 0
+                    self.consumed += frames - offset
+                    offset = frames
+                elif not more:
+                    break
+        done = offset < frames
+        if done:
+            outdata[offset:] = 0
+        
+        if self.effects is not None:
+            effects_started = time.perf_counter()
+            outdata[:] = self.effects.process(outdata[:, 0].copy())[:, None]
+            self.stats.on_effects(frames, (time.perf_counter() - effects_started) * 1000.0)
+            if done:
+                # Let reverb and filter tails ring out before closing the stream
+                if self.tail_left is None:
+                    self.tail_left = self.effects.tail_frames - (frames - offset)
+                else:
+                    self.tail_left -= frames
+                done = self.tail_left <= 0
+        
+        self.stats.on_callback(frames, time_info, status, (time.perf_counter() - started) * 1000.0)
+        if done:
+            raise sd.CallbackStop
+    
+    def _sync(self, frames, time_info):
+        """Return how many leading frames of this block stay silent before frame 0"""
+        if self.sync_start is None or time_info.outputBufferDacTime <= 0:
+            # No shared clock: pad by the latency difference computed at open time
+            self.sync_start = None
+            lead = min(frames, self.lead_frames)
+            self.lead_frames -= lead
+            self.audio_started = self.lead_frames == 0
+            return lead
+        
+        # Source frame due at the DAC together with this block's first frame
+        due = (time_info.outputBufferDacTime - self.sync_start) * self.samplerate
+        if due < 0:
+            lead = int(round(-due))
+            if lead >= frames:
+                return frames
+            self.audio_started = True
+            return lead
+        
+        # This device came up late: skip ahead so it joins in step
+        self.position = min(len(self.data), int(round(due)))
+        self.audio_started = True
+        return 0
+    
+    def _correct_drift(self, time_info):
+        """Nudge the read position one frame at a time to follow the shared clock"""
+        if time_info.outputBufferDacTime <= 0:
+            return
+        due = (time_info.outputBufferDacTime - self.sync_start) * self.samplerate
+        error = due - (self.consumed + self.position)
+        self.drift += (error - self.drift) * 0.05
+        if self.drift > self.drift_tolerance and self.position < len(self.data):
+            self.position += 1
+            self.drift -= 1
+            self.stats.drift_corrections += 1
+        elif self.drift < -self.drift_tolerance and self.position > 0:
+            self.position -= 1
+            self.drift += 1
+            self.stats.drift_corrections += 1
+        
+        drift_ms = self.drift / self.samplerate * 1000.0
+        self.stats.drift_ms = drift_ms
+        if abs(drift_ms) > self.stats.drift_ms_max:
+            self.stats.drift_ms_max = abs(drift_ms)
+    
+    def _next_buffer(self):
+        """Switch to the next queued buffer; False at the end, None while a stream catches up"""
+        with self._lock:
+            if not self.buffers:
+                if self.input_open:
+                    self.stats.starved += 1
+                    return None
+                self.ended = True
+                return False
+            self.consumed += len(self.data)
+            data, tag = self.buffers.popleft()
+            if tag is not self.tag:
+                self.tag_position = 0
+            self.data, self.tag = data, tag
+            self.position = 0
+            return True
+    
+    def append(self, data, tag=None, input_open=None):
+        """Queue a buffer to play right after the current one; False once playback has ended"""
+        with self._lock:
+            if self.ended or self.finished.is_set():
+                return False
+            if len(data):
+                self.buffers.append((data, tag))
+            if input_open is not None:
+                self.input_open = input_open
+            return True
+    
+    def discard(self, tag):
+        """Drop the queued buffers of one item (the buffer playing now is kept)"""
+        with self._lock:
+            self.buffers = deque(entry for entry in self.buffers if entry[1] is not tag)
+    
+    def is_queued(self, tag):
+        """Check whether an item has buffers waiting and hasn't started playing"""
+        with self._lock:
+            return self.tag is not tag and any(entry[1] is tag for entry in self.buffers)
+    
+    def start(self):
+        self.stream.start()
+    
+    def stop(self):
+        try:
+            self.stream.abort()
+        except Exception:
+            pass
+        self.finished.set()
+    
+    def close(self):
+        try:
+            self.stream.close()
+        except Exception:
+            pass
+
+class AudioPlayer:
+    """Plays mono buffers on one or more devices and keeps per-device health stats"""
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self.blocksize = 0      # 0 = let the host pick
+        self.latency = None     # None = sounddevice default ('high')
+        self.outputs = []
+        self.devices = []
+        self.device_stats = {}  # {device index: DeviceStats}
+        self.session = 0        # Bumped whenever playback is started or stopped
+        self.feeding = 0        # Streamed clips still being read from disk
+        self.prepared_hits = 0  # Buffers handed over already at the device rate
+        self.resamples = 0      # Buffers resampled at play time
+        self.effects_for = lambda device_index: []  # Effect names to apply on a device
+        self.effect_params = {}  # {effect name: keyword args}
+        self._lock = threading.Lock()
+    
+    def device_rate(self, device_index):
+        """Return the rate a device's stream is opened at (its default rate)"""
+        return int(sd.query_devices(device_index)['default_samplerate'])
+    
+    def _convert(self, data, samplerate, device_rate, device, resamplers=None, final=False, prepared=None):
+        """Resample a buffer to a device rate (statefully when streaming blocks)"""
+        if prepared and device_rate in prepared:
+            self.prepared_hits += 1
+            return prepared[device_rate]
+        if resamplers is not None:
+            if device_rate not in resamplers:
+                resamplers[device_rate] = StreamResampler(samplerate, device_rate)
+            return resamplers[device_rate].process(data, final)
+        if device_rate == samplerate:
+            return data
+        self.resamples += 1
+        with self.tracer.span('resample', device=device, rate_in=samplerate, rate_out=device_rate):
+            return resample(data, samplerate, device_rate)
+    
+    def play(self, data, samplerate, devices, tag=None, resamplers=None, final=True, prepared=None):
+        """Start playback of a mono float32 buffer on every device, in step"""
+        self.stop()
+        outputs = []
+        resampled = {}  # {device rate: buffer}, shared by devices at the same rate
+        for device_index in devices:
+            try:
+                device_info = sd.query_devices(device_index)
+                max_channels = device_info['max_output_channels']
+                if max_channels < 1:
+                    print(f"Warning: Device {device_index} has {max_channels} channels")
+                    continue
+                
+                # Play at the device's native rate so the host doesn't resample
+                device_rate = int(device_info['default_samplerate']) or samplerate
+                if device_rate not in resampled:
+                    resampled[device_rate] = self._convert(data, samplerate, device_rate, device_index,
+                                                           resamplers, final, prepared)
+                
+                stats = self.stats_for(device_index, device_info['name'])
+                channels = 1 if max_channels == 1 else 2
+                effect_names = self.effects_for(device_index)
+                effects = (EffectsChain.build(effect_names, device_rate, self.effect_params)
+                           if effect_names else None)
+                stats.effects = ", ".join(effect_names)
+                with self.tracer.span('device_open', device=device_index, channels=channels):
+                    output = DeviceOutput(device_index, resampled[device_rate], device_rate, channels,
+                                          stats, self.blocksize, self.latency, tag, effects)
+                output.input_open = not final
+                outputs.append(output)
+            except Exception as e:
+                print(f"Error playing on device {device_index}: {e}")
+        
+        if len(outputs) > 1:
+            self._align(outputs)
+        for output in outputs:
+            try:
+                output.start()
+            except Exception as e:
+                print(f"Error starting device {output.device}: {e}")
+                output.finished.set()
+        
+        with self._lock:
+            self.outputs = outputs
+            self.devices = list(devices)
+            self.session += 1
+        return outputs
+    
+    def enqueue(self, data, samplerate, tag=None, resamplers=None, final=True, prepared=None):
+        """Append a buffer to the running playback so it follows without a gap"""
+        with self._lock:
+            outputs = list(self.outputs)
+        if not outputs:
+            return False
+        
+        resampled = {}
+        for output in outputs:
+            if output.samplerate not in resampled:
+                resampled[output.samplerate] = self._convert(data, samplerate, output.samplerate,
+                                                             output.device, resamplers, final, prepared)
+            if not output.append(resampled[output.samplerate], tag, input_open=not final):
+                return False
+        return True
+    
+    def stream_file(self, path, volume, devices, tag=None, join=True, block_seconds=0.5, max_pending=4,
+                    cancel=None):
+        """Play a clip straight from disk in fixed-size blocks; returns the reader thread"""
+        with self._lock:
+            self.feeding += 1
+        handed = threading.Event()  # Set once the first block reached the outputs
+        thread = threading.Thread(
+            target=self._feed,
+            args=(path, volume, list(devices), tag, join, block_seconds, max_pending, handed, cancel),
+            daemon=True
+        )
+        thread.start()
+        handed.wait(5.0)
+        return thread
+    
+    def _feed(self, path, volume, devices, tag, join, block_seconds, max_pending, handed, cancel):
+        """Decode blocks and hand them to the outputs, keeping at most max_pending queued"""
+        import numpy as np
+        
+        try:
+            with sf.SoundFile(path) as f:
+                sr = f.samplerate
+                block_frames = max(1, int(sr * block_seconds))
+                resamplers = {}  # {device rate: StreamResampler}
+                session = None
+                while True:
+                    block = f.read(block_frames, dtype='float32', always_2d=True)
+                    final = len(block) < block_frames
+                    mono = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+                    np.multiply(mono, volume, out=mono)
+                    np.clip(mono, -1.0, 1.0, out=mono)
+                    
+                    if session is None:
+                        # The first block follows the current playback or starts a new one
+                        joined = (join and self.devices == devices and
+                                  self.enqueue(mono, sr, tag, resamplers, final))
+                        if not joined:
+                            self.play(mono, sr, devices, tag, resamplers, final)
+                        session = self.session
+                        handed.set()
+                    elif cancel is not None and cancel.cancelled:
+                        self.discard(tag)
+                        break  # Dropped from the queue
+                    elif session != self.session or not self.enqueue(mono, sr, tag, resamplers, final):
+                        break  # Stopped
+                    if final:
+                        break
+                    
+                    # Bounded read-ahead keeps memory flat whatever the clip length
+                    while self.pending_count() >= max_pending and session == self.session:
+                        time.sleep(0.01)
+        except Exception as e:
+            print(f"Error streaming {path}: {e}")
+        finally:
+            handed.set()
+            with self._lock:
+                self.feeding -= 1
+                outputs = list(self.outputs)
+            for output in outputs:
+                output.input_open = False
+    
+    def is_feeding(self):
+        with self._lock:
+            return self.feeding > 0
+    
+    def is_queued(self, tag):
+        """Check whether an item is queued behind the current playback and hasn't started"""
+        if tag is None:
+            return False
+        with self._lock:
+            outputs = [o for o in self.outputs if not o.finished.is_set()]
+        return any(output.is_queued(tag) for output in outputs)
+    
+    def discard(self, tag):
+        """Drop an item queued behind the current playback"""
+        with self._lock:
+            outputs = list(self.outputs)
+        for output in outputs:
+            output.discard(tag)
+    
+    def pending_count(self):
+        """Return how many buffers are queued behind the one playing"""
+        with self._lock:
+            return max((len(output.buffers) for output in self.outputs), default=0)
+    
+    def current(self):
+        """Return (tag, fraction played) of the buffer now playing, or (None, 0.0)"""
+        with self._lock:
+            outputs = [o for o in self.outputs if not o.finished.is_set()]
+        if not outputs:
+            return None, 0.0
+        output = outputs[0]
+        tag = output.tag
+        duration = tag.get('duration') if isinstance(tag, dict) else None
+        if duration:
+            return tag, min(1.0, output.tag_position / output.samplerate / duration)
+        data = output.data
+        return tag, (min(output.position, len(data)) / len(data) if len(data) else 1.0)
+    
+    def wait_started(self, timeout=None):
+        """Wait until the first sample has been handed to a device"""
+        with self._lock:
+            outputs = list(self.outputs)
+        deadline = time.monotonic() + (timeout or 0)
+        for output in outputs:
+            remaining = None if timeout is None else max(0.0, deadline - time.monotonic())
+            if output.started.wait(remaining):
+                return True
+        return False
+    
+    def _align(self, outputs):
+        """Schedule every output so frame 0 reaches each DAC at the same moment"""
+        # Devices with less output latency wait for the slowest one
+        max_latency = max(output.stream.latency for output in outputs)
+        margin = 0.05  # Room for every stream to deliver its first callback
+        start_time = max(output.stream.time for output in outputs) + max_latency + margin
+        # Effect filters delay their output too: dry devices wait for the wettest one
+        effects_delay = [output.effects.latency / output.samplerate if output.effects else 0.0
+                         for output in outputs]
+        max_delay = max(effects_delay)
+        for output, delay in zip(outputs, effects_delay):
+            lead = max_latency - output.stream.latency + max_delay - delay
+            output.sync_start = start_time + max_delay - delay
+            output.lead_frames = int(round(lead * output.samplerate))
+            output.stats.sync_lead_ms = lead * 1000.0
+    
+    def wait(self):
+        """Block until every device has finished, then release the streams"""
+        with self._lock:
+            outputs = list(self.outputs)
+        for output in outputs:
+            output.finished.wait()
+            output.close()
+    
+    def stop(self):
+        with self._lock:
+            outputs = self.outputs
+            self.outputs = []
+            self.session += 1
+        for output in outputs:
+            output.stop()
+            output.close()
+    
+    def is_active(self):
+        with self._lock:
+            return any(not output.finished.is_set() for output in self.outputs)
+    
+    def first_sample_time(self):
+        """Return perf_counter time at which the first sample reached a DAC, if known"""
+        with self._lock:
+            marks = [o.first_callback for o in self.outputs if o.first_callback]
+        if not marks:
+            return None
+        return min(started + dac_latency for started, dac_latency in marks)
+    
+    def stats_for(self, device_index, name):
+        stats = self.device_stats.get(device_index)
+        if stats is None:
+            stats = self.device_stats[device_index] = DeviceStats(device_index, name)
+        return stats
+    
+    def get_stats(self):
+        """Return {device index: stats dict} for every device used so far"""
+        return {index: stats.snapshot() for index, stats in list(self.device_stats.items())}
+    
+    def reset_stats(self):
+        self.device_stats.clear()
+
+class ServiceUnavailable(Exception):
+    """Raised when the speech service can't be used and nothing is cached"""
+
+class Cancelled(Exception):
+    """Raised when a request's cancellation token has fired"""
+
+class CancelToken:
+    """Cancellation flag shared by every stage working on one request"""
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def cancel(self):
+        """Fire the token and run its callbacks (once)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in cancel callback: {e}")
+    
+    def check(self):
+        """Raise Cancelled if the token has fired"""
+        if self._event.is_set():
+            raise Cancelled()
+    
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; True if cancelled meanwhile"""
+        return self._event.wait(timeout)
+    
+    def on_cancel(self, callback):
+        """Run callback when the token fires (now if it already has); returns an unregister function"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+    
+    def _discard(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+NO_CANCEL = CancelToken()  # Never fired; for callers without a request
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter for backend requests"""
+    def __init__(self, rate, burst):
+        self.rate = rate      # Tokens added per second
+        self.burst = burst    # Bucket capacity
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self, cancel=NO_CANCEL):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                delay = (1.0 - self.tokens) / self.rate
+                self.waits += 1
+                self.wait_seconds += delay
+            if cancel.wait(delay):
+                raise Cancelled()
+
+class CircuitBreaker:
+    """Stops calling the backend after repeated failures until a cool-down has passed"""
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probe_thread = None  # Thread holding the half-open probe slot
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Return True if a request may be sent now (after a cool-down, claims the single probe slot)"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let a single probe request through
+                self.state = self.HALF_OPEN
+                self.probe_thread = threading.get_ident()
+                return True
+            return self.state == self.CLOSED
+    
+    def is_open(self):
+        """Return True if requests are currently refused, without claiming the probe slot"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN
+    
+    def abandon_probe(self):
+        """Give back this thread's probe slot if no outcome was recorded (cancelled or never sent)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.probe_thread == threading.get_ident():
+                self.state = self.OPEN
+                self.probe_thread = None
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_thread = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.probe_thread = None
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    print(f"Speech service marked unhealthy for {self.reset_timeout:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
 class TTSApp:
     def __init__(self, root):
         self.root = root
         self.root.title("TTS App")
-        self.root.geometry("450x450")
+        self.root.geometry("450x660")
         self.root.resizable(False, False)
         
         # Config file path
         self.config_file = "tts_settings.ini"
         self.soundboard_file = "soundboard.json"
         
+        # Request tracing (off unless enabled in Options or via TTS_TRACE=1)
+        self.tracer = Tracer("tts_trace.jsonl")
+        self.tracer.enabled = os.environ.get("TTS_TRACE", "") not in ("", "0")
+        self.tracing_var = tk.BooleanVar(value=self.tracer.enabled)
+        
+        # Memory/CPU profiling (off unless enabled in Stats or via TTS_PROFILE=1)
+        self.profiler = Profiler("tts_profile.log")
+        self.profiling_var = tk.BooleanVar(value=os.environ.get("TTS_PROFILE", "") not in ("", "0"))
+        
         # Cache directory for audio files
         self.cache_dir = "tts_cache"
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
+        self.cache_index_file = os.path.join(self.cache_dir, "index.json")
+        # Rate/pitch variants rendered locally from cached clips
+        self.variants_dir = os.path.join(self.cache_dir, "variants")
+        if not os.path.exists(self.variants_dir):
+            os.makedirs(self.variants_dir)
+        # Long texts are cached sentence by sentence and stitched on playback
+        self.segments_dir = os.path.join(self.cache_dir, "segments")
+        if not os.path.exists(self.segments_dir):
+            os.makedirs(self.segments_dir)
+        self.segment_min_chars = 200  # Shorter texts are cached whole
+        self.segment_crossfade_ms = 20
+        self.max_scripts = 20  # Stitched long texts kept for instant replay
+        # Hot clips pre-rendered at each output device's rate
+        self.native_dir = os.path.join(self.cache_dir, "native")
+        if not os.path.exists(self.native_dir):
+            os.makedirs(self.native_dir)
+        self.native_after_plays = 2  # Plays before a clip counts as hot
+        self.play_counts = {}  # {audio file: plays this session}
+        # Peak/RMS sidecars drawn as soundboard thumbnails
+        self.peaks_dir = os.path.join(self.cache_dir, "peaks")
+        if not os.path.exists(self.peaks_dir):
+            os.makedirs(self.peaks_dir)
+        self.thumbnails = {}  # {audio file: (sidecar mtime_ns, sparkline, duration)}
+        self.peaks_running = False
+        self.sound_files = []  # Audio file of each soundboard row
+        # Lock files let several app instances share the cache folder
+        self.locks_dir = os.path.join(self.cache_dir, "locks")
+        if not os.path.exists(self.locks_dir):
+            os.makedirs(self.locks_dir)
+        self.lock_timeout = 60.0
+        self.verified_entries = {}  # {path: (mtime_ns, size)} of entries already validated
+        for folder in (self.cache_dir, self.variants_dir, self.native_dir, self.segments_dir, self.peaks_dir):
+            remove_stale_parts(folder)
+        
+        # Backend resilience: rate limit, retries with backoff, circuit breaker
+        self.rate_limiter = TokenBucket(rate=2.0, burst=5)
+        self.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+        self.backend_retries = 3
+        self.backend_retry_count = 0
+        self.import_running = False
         
         # Available voices using edge-tts API compatible voices (tested and working)
         self.voices = [
@@ -46,16 +1860,55 @@ class TTSApp:
             {"name": "🇮🇳 Prabhat (Male, IN)", "voice": "en-IN-PrabhatNeural"},
         ]
         
+        # Full voice catalog, cached on disk and refreshed in the background
+        self.voices_file = "voices.json"
+        self.voices_ttl = 7 * 24 * 3600
+        self.voice_by_id = {}         # {voice id: voice}
+        self.voices_by_locale = {}    # {locale: [voice]}
+        self.voices_by_gender = {}    # {gender: [voice]}
+        self.filtered_voices = []     # Voices currently listed in the dropdown
+        catalog_fetched = self.load_voice_catalog()
+        self.index_voices()
+        
         self.audio_devices = sd.query_devices()
         
         # Playback control
+        self.player = AudioPlayer(self.tracer)
+        # Output effects, applied per block; each output opts in separately
+        self.effect_vars = {name: tk.BooleanVar(value=False) for name in EffectsChain.EFFECTS}
+        self.fx_output1_var = tk.BooleanVar(value=False)
+        self.fx_output2_var = tk.BooleanVar(value=True)
+        self.effect_params = {
+            'eq': {'low_db': -2.0, 'mid_db': 3.0, 'high_db': 2.0},
+            'compressor': {'threshold_db': -18.0, 'ratio': 4.0, 'makeup_db': 3.0},
+            'radio': {'low_hz': 300.0, 'high_hz': 3400.0, 'drive': 3.0},
+            'reverb': {'seconds': 0.8, 'mix': 0.25, 'ir_file': ''}
+        }
+        self.player.effects_for = self.effects_for_device
+        self.player.effect_params = self.effect_params
+        self.audio_stats_interval = 0  # Seconds between audio health log lines (0 = off)
+        self.stream_threshold = 60.0   # Clips longer than this (seconds) are streamed from disk
         self.is_playing = False
         self.volume = tk.DoubleVar(value=1.0)  # 0.0 to 2.0
+        self.speech_rate = 1.0   # Speaking rate multiplier, applied locally
+        self.speech_pitch = 0    # Pitch shift in semitones, applied locally
+        
+        # Playback queue: items are prepared one ahead and played back to back
+        self.tts_queue = deque()  # [item dict] waiting to be prepared
+        self.queue_cond = threading.Condition()
+        self.queue_worker = None
+        self.queue_counter = 0
+        self.preparing = None  # Item being synthesized/decoded ahead
+        self.queued_ahead = None  # Prepared item waiting behind the one playing
+        self._queue_view = None
+        self._poll_active = False
         self.volume_percent = None  # Will be set in create_main_frame
         
         # Soundboard
-        self.soundboard_bindings = {}  # {hotkey: filepath}
+        self.soundboard_bindings = {}  # {hotkey: filepath}, replaced whole on every change
         self.hotkey_listener = None
+        self.key_capture = None  # Pending "press a key" request, answered by the listener
+        self.capture_timeout = 5.0  # Seconds to wait for a key when assigning
         self.load_soundboard()
         
         # Dark mode state
@@ -85,82 +1938,565 @@ class TTSApp:
             'hover': '#3d3d3d'
         }
         
-        # Create frames
-        self.create_main_frame()
-        self.create_options_frame()
-        self.create_soundboard_frame()
+        # Create frames
+        self.create_main_frame()
+        self.create_options_frame()
+        self.create_soundboard_frame()
+        self.create_stats_frame()
+        
+        # Load settings
+        self.load_settings()
+        
+        # Apply initial theme
+        self.apply_theme()
+        
+        # Show main frame
+        self.main_frame.pack(fill='both', expand=True)
+        
+        # Start global hotkey listener
+        self.start_hotkey_listener()
+        
+        # Refresh the voice catalog without blocking startup
+        if time.time() - catalog_fetched > self.voices_ttl:
+            threading.Thread(target=self.refresh_voice_catalog, daemon=True).start()
+        
+        # Keep the progress bar and queue view current
+        self.root.after(100, self._poll_playback)
+        
+        # Periodic profile reports
+        if self.profiling_var.get():
+            self.profiler.start()
+        
+        # Periodic audio health log lines
+        if self.audio_stats_interval > 0:
+            threading.Thread(target=self._audio_stats_logger, daemon=True).start()
+        
+        # Save settings on close
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+    
+    def sanitize_filename(self, text):
+        """Create safe filename from text"""
+        # Remove or replace invalid filename characters
+        invalid_chars = '<>:"/\\|?*'
+        for char in invalid_chars:
+            text = text.replace(char, '')
+        # Limit length
+        text = text[:50]
+        return text.strip()
+    
+    def get_voice_short_name(self, voice_name):
+        """Extract a readable short name from voice ID"""
+        # voice_name format: "en-US-JennyNeural"
+        parts = voice_name.split('-')
+        voice = self.voice_by_id.get(voice_name)
+        if len(parts) >= 3 and voice is not None:
+            country = parts[1]  # "US"
+            name = parts[-1].replace('Neural', '')  # "Jenny"
+            return f"{name}{voice['gender']}{country}"
+        
+        return "Voice"
+    
+    def load_voice_catalog(self):
+        """Load the cached voice catalog; returns when it was fetched (0 if never)"""
+        if os.path.exists(self.voices_file):
+            try:
+                with open(self.voices_file, 'r', encoding='utf-8') as f:
+                    catalog = json.load(f)
+                if catalog.get('voices'):
+                    self.voices = catalog['voices']
+                    return catalog.get('fetched', 0)
+            except Exception as e:
+                print(f"Error loading voice catalog: {e}")
+        return 0
+    
+    def refresh_voice_catalog(self):
+        """Fetch every voice the backend offers and cache the list on disk"""
+        import edge_tts
+        import asyncio
+        
+        try:
+            with self.tracer.span('voice_catalog'):
+                listed = asyncio.run(edge_tts.list_voices())
+        except Exception as e:
+            print(f"Error fetching voice catalog: {e}")
+            return
+        
+        voices = []
+        for entry in sorted(listed, key=lambda v: (v['Locale'], v['ShortName'])):
+            voice_id = entry['ShortName']
+            locale = entry['Locale']
+            region = locale.split('-')[1] if '-' in locale else locale
+            name = voice_id.split('-')[-1].replace('Neural', '')
+            # Regional indicator letters render as the country flag
+            flag = ''.join(chr(0x1F1E6 + ord(c) - ord('A')) for c in region.upper() if 'A' <= c <= 'Z')
+            region_label = 'UK' if region == 'GB' else region
+            voices.append({
+                "name": f"{flag} {name} ({entry['Gender']}, {region_label})".strip(),
+                "voice": voice_id,
+                "locale": locale,
+                "gender": entry['Gender']
+            })
+        if not voices:
+            # An empty answer would leave nothing to select; keep the voices we have
+            print("Voice catalog came back empty, keeping the current list")
+            return
+        
+        try:
+            catalog = {'fetched': time.time(), 'voices': voices}
+            atomic_write(self.voices_file, json.dumps(catalog, indent=2, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            print(f"Error saving voice catalog: {e}")
+        
+        print(f"Voice catalog updated: {len(voices)} voices")
+        self.root.after(0, lambda: self.set_voice_catalog(voices))
+    
+    def set_voice_catalog(self, voices):
+        """Swap in a new catalog, keeping the current selection"""
+        selected = self.get_selected_voice()
+        self.voices = voices
+        self.index_voices()
+        self.locale_filter.config(values=["All"] + sorted(self.voices_by_locale))
+        self.filter_voices(selected)
+    
+    def index_voices(self):
+        """Build the id, locale and gender indexes over self.voices"""
+        # Built aside and swapped in, so synthesis threads never look up a half-filled index
+        by_id = {}
+        by_locale = {}
+        by_gender = {}
+        for voice in self.voices:
+            voice.setdefault('locale', '-'.join(voice['voice'].split('-')[:2]))
+            if 'gender' not in voice:
+                voice['gender'] = ('Female' if 'Female' in voice['name']
+                                   else 'Male' if 'Male' in voice['name'] else '')
+            by_id[voice['voice']] = voice
+            by_locale.setdefault(voice['locale'], []).append(voice)
+            by_gender.setdefault(voice['gender'], []).append(voice)
+        self.voice_by_id = by_id
+        self.voices_by_locale = by_locale
+        self.voices_by_gender = by_gender
+    
+    def filter_voices(self, keep_voice=None):
+        """Fill the voice dropdown with the voices matching the locale/gender filters"""
+        locale = self.locale_filter.get()
+        gender = self.gender_filter.get()
+        if locale and locale != "All":
+            voices = self.voices_by_locale.get(locale, [])
+        else:
+            voices = self.voices
+        if gender and gender != "All":
+            voices = [v for v in voices if v['gender'] == gender]
+        
+        self.filtered_voices = voices
+        self.voice_dropdown.config(values=[v['name'] for v in voices])
+        if not voices:
+            self.voice_dropdown.set('')
+            return
+        ids = [v['voice'] for v in voices]
+        self.voice_dropdown.current(ids.index(keep_voice) if keep_voice in ids else 0)
+    
+    def on_voice_filter(self, event=None):
+        self.filter_voices(self.get_selected_voice())
+        self.save_settings()
+    
+    def get_selected_voice(self):
+        """Return the voice ID picked in the dropdown"""
+        index = self.voice_dropdown.current()
+        if 0 <= index < len(self.filtered_voices):
+            return self.filtered_voices[index]['voice']
+        return self.voices[0]['voice']
+    
+    def select_voice(self, voice_name):
+        """Select a voice by ID, clearing the filters if they hide it"""
+        if voice_name not in self.voice_by_id:
+            return
+        if voice_name not in [v['voice'] for v in self.filtered_voices]:
+            self.locale_filter.set("All")
+            self.gender_filter.set("All")
+        self.filter_voices(voice_name)
+    
+    def get_cache_file(self, text, voice_name):
+        """Return the cache path for a phrase spoken by a voice"""
+        # Create readable filename with voice info
+        safe_text = self.sanitize_filename(text)
+        voice_short = self.get_voice_short_name(voice_name)
+        filename = f"{safe_text}-{voice_short}.mp3"
+        return os.path.join(self.cache_dir, filename)
+    
+    def synthesize_edgetts(self, text, voice_name, word_boundaries=False, cancel=NO_CANCEL):
+        """Run one edge-tts request and return (mp3 bytes, word boundaries)"""
+        import edge_tts
+        import asyncio
+        
+        async def _generate():
+            if word_boundaries:
+                try:
+                    communicate = edge_tts.Communicate(text, voice_name, boundary="WordBoundary")
+                except TypeError:
+                    # edge-tts < 7 always reports word boundaries
+                    communicate = edge_tts.Communicate(text, voice_name)
+            else:
+                communicate = edge_tts.Communicate(text, voice_name)
+            chunks = []
+            boundaries = []  # [(start seconds, end seconds, word)]
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    chunks.append(chunk["data"])
+                elif chunk["type"] == "WordBoundary":
+                    start = chunk["offset"] / 1e7  # 100 ns ticks
+                    boundaries.append((start, start + chunk["duration"] / 1e7, chunk["text"]))
+            return b"".join(chunks), boundaries
         
-        # Load settings
-        self.load_settings()
+        async def _cancellable():
+            # Stop cancels the task, which closes the connection mid-stream
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(_generate())
+            
+            def cancel_task():
+                try:
+                    loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass  # Loop already finished
+            
+            unregister = cancel.on_cancel(cancel_task)
+            try:
+                return await task
+            except asyncio.CancelledError:
+                raise Cancelled()
+            finally:
+                unregister()
         
-        # Apply initial theme
-        self.apply_theme()
+        if not self.breaker.allow():
+            raise ServiceUnavailable("speech service is unhealthy, using cached audio only")
         
-        # Show main frame
-        self.main_frame.pack(fill='both', expand=True)
+        try:
+            for attempt in range(self.backend_retries + 1):
+                self.rate_limiter.acquire(cancel)
+                try:
+                    # Run async function
+                    with self.tracer.span('backend_request', voice=voice_name, text_len=len(text),
+                                          attempt=attempt), self.profiler.section('synthesis'):
+                        result = asyncio.run(_cancellable())
+                    self.breaker.record_success()
+                    return result
+                except (ValueError, TypeError, Cancelled):
+                    # Bad input, retrying won't help; a cancelled request says nothing about the service
+                    raise
+                except Exception as e:
+                    self.breaker.record_failure()
+                    if attempt == self.backend_retries or not self.breaker.allow():
+                        raise
+                    # Exponential backoff with full jitter
+                    delay = random.uniform(0, min(10.0, 0.5 * 2 ** attempt))
+                    self.backend_retry_count += 1
+                    print(f"Speech request failed ({e}), retrying in {delay:.1f}s")
+                    if cancel.wait(delay):
+                        raise Cancelled()
+        finally:
+            # A probe that ended without an outcome must not leave the breaker half-open for good
+            self.breaker.abandon_probe()
+    
+    def generate_speech_edgetts(self, text, voice_name, fallback=True, cancel=NO_CANCEL, cache_file=None):
+        """Generate speech using edge-tts with caching and readable filenames"""
+        cache_file = cache_file or self.get_cache_file(text, voice_name)
+        filename = os.path.basename(cache_file)
         
-        # Start global hotkey listener
-        self.start_hotkey_listener()
+        with self.tracer.span('synthesize', voice=voice_name, text_len=len(text)) as span:
+            # Check if we have a cached version
+            if self.is_cache_hit(cache_file):
+                span.set(cache='hit')
+                print(f"Using cached audio: {filename}")
+                return cache_file
+            
+            # Another instance may be synthesizing this phrase right now: wait for it
+            lock = self.cache_lock(cache_file)
+            if not lock.acquire(cancel):
+                print(f"Cache entry still locked after {self.lock_timeout:.0f}s, synthesizing anyway: {filename}")
+            try:
+                if self.is_cache_hit(cache_file):
+                    span.set(cache='shared')
+                    print(f"Using cached audio from another instance: {filename}")
+                    return cache_file
+                
+                span.set(cache='miss')
+                
+                # Generate new audio
+                try:
+                    audio_bytes, _ = self.synthesize_edgetts(text, voice_name, cancel=cancel)
+                except (ValueError, TypeError, Cancelled):
+                    raise
+                except Exception as e:
+                    if not fallback:
+                        raise
+                    span.set(fallback='local')
+                    print(f"Speech service failed ({e}), trying the local voice")
+                    return self.generate_speech_local(text)
+                
+                # A request that completed is kept even if it was cancelled meanwhile
+                with self.tracer.span('file_write', size=len(audio_bytes)):
+                    atomic_write(cache_file, audio_bytes)
+                threading.Thread(target=self.write_peaks, args=(cache_file,), daemon=True).start()
+                return cache_file
+            finally:
+                lock.release()
+    
+    def generate_speech_local(self, text):
+        """Speak with the system's offline voice (pyttsx3) while the service is down"""
+        try:
+            import pyttsx3
+        except ImportError:
+            raise ServiceUnavailable("speech service unavailable and no cached audio for this text")
         
-        # Save settings on close
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        # The stand-in voice is never cached; _tts_thread deletes the file after decoding
+        fd, path = tempfile.mkstemp(prefix="tts_fallback_", suffix=".wav")
+        os.close(fd)
+        engine = pyttsx3.init()
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        return path
     
-    def sanitize_filename(self, text):
-        """Create safe filename from text"""
-        # Remove or replace invalid filename characters
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            text = text.replace(char, '')
-        # Limit length
-        text = text[:50]
-        return text.strip()
+    def is_fallback_file(self, path):
+        return os.path.basename(path).startswith("tts_fallback_")
     
-    def get_voice_short_name(self, voice_name):
-        """Extract a readable short name from voice ID"""
-        # voice_name format: "en-US-JennyNeural"
-        parts = voice_name.split('-')
-        if len(parts) >= 3:
-            country = parts[1]  # "US"
-            name = parts[2].replace('Neural', '')  # "Jenny"
-            
-            # Find the full voice info to get gender
-            for voice in self.voices:
-                if voice['voice'] == voice_name:
-                    voice_display = voice['name']
-                    if 'Female' in voice_display:
-                        gender = 'Female'
-                    elif 'Male' in voice_display:
-                        gender = 'Male'
-                    else:
-                        gender = ''
-                    return f"{name}{gender}{country}"
+    def get_variant_file(self, audio_file, rate, semitones, cancel=NO_CANCEL):
+        """Return a rate/pitch variant of a clip, rendered locally and memoized on disk"""
+        if rate == 1.0 and semitones == 0:
+            return audio_file
         
-        return "Voice"
+        fallback = self.is_fallback_file(audio_file)
+        if fallback:
+            # Stand-in voice clips aren't cached, so neither are their variants
+            fd, variant = tempfile.mkstemp(prefix="tts_fallback_", suffix=".wav")
+            os.close(fd)
+        else:
+            stem = os.path.splitext(os.path.basename(audio_file))[0]
+            variant = os.path.join(self.variants_dir, f"{stem}@r{round(rate * 100)}p{semitones:+d}.wav")
+        
+        def render(dest_path):
+            # Block by block, so long clips take no more memory than short ones
+            with self.tracer.span('transform', rate=rate, semitones=semitones) as span:
+                frames = transform_file(audio_file, dest_path, rate, semitones, cancel=cancel)
+                span.set(frames=frames)
+        
+        if fallback:
+            try:
+                render(variant)
+            except BaseException:
+                os.remove(variant)
+                raise
+            finally:
+                os.remove(audio_file)
+            return variant
+        
+        with self.cache_lock(variant):
+            # Reuse unless the base clip was synthesized again since
+            if (self.is_cache_hit(variant) and
+                    os.path.getmtime(variant) >= os.path.getmtime(audio_file)):
+                return variant
+            with atomic_path(variant) as temp_path:
+                render(temp_path)
+        return variant
     
-    def generate_speech_edgetts(self, text, voice_name):
-        """Generate speech using edge-tts with caching and readable filenames"""
-        import edge_tts
-        import asyncio
+    def generate_speech_batch(self, phrases, voice_name, progress=None, max_chars=2000,
+                              cache_file_for=None, cancel=NO_CANCEL):
+        """Synthesize many short phrases in a few backend requests, one cache entry each"""
+        cache_file_for = cache_file_for or self.get_cache_file
+        cache_files = [cache_file_for(phrase, voice_name) for phrase in phrases]
         
-        # Create readable filename with voice info
-        safe_text = self.sanitize_filename(text)
-        voice_short = self.get_voice_short_name(voice_name)
-        filename = f"{safe_text}-{voice_short}.mp3"
-        cache_file = os.path.join(self.cache_dir, filename)
+        # Only uncached, distinct phrases go to the backend
+        pending = {}
+        for phrase, cache_file in zip(phrases, cache_files):
+            if cache_file not in pending and not self.is_cache_hit(cache_file):
+                pending[cache_file] = phrase
         
-        # Check if we have a cached version
-        if os.path.exists(cache_file):
-            print(f"Using cached audio: {filename}")
-            return cache_file
+        batches = []
+        batch, size = [], 0
+        for cache_file, phrase in pending.items():
+            if batch and size + len(phrase) > max_chars:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append((phrase, cache_file))
+            size += len(phrase) + 2
+        if batch:
+            batches.append(batch)
         
-        # Generate new audio
-        async def _generate():
-            communicate = edge_tts.Communicate(text, voice_name)
-            await communicate.save(cache_file)
+        print(f"Batch synthesis: {len(phrases)} phrases, {len(pending)} uncached, {len(batches)} requests")
+        done = 0
+        for entries in batches:
+            # Another instance may be synthesizing the same phrases: wait for it, then skip what it cached
+            locks = self.lock_entries([cache_file for _, cache_file in entries], cancel)
+            failed = None
+            try:
+                batch = [(phrase, cache_file) for phrase, cache_file in entries
+                         if not self.is_cache_hit(cache_file)]
+                if batch:
+                    self._synthesize_batch(batch, voice_name, cancel=cancel)
+            except (ServiceUnavailable, Cancelled):
+                raise
+            except Exception as e:
+                failed = e
+            finally:
+                for lock in locks:
+                    lock.release()
+            
+            if failed is not None:
+                if self.breaker.is_open():
+                    raise ServiceUnavailable(f"speech service unavailable ({failed})")
+                # Fall back to one request per phrase (each takes its own lock)
+                print(f"Batch split failed ({failed}), synthesizing {len(batch)} phrases one by one")
+                for phrase, cache_file in batch:
+                    self.generate_speech_edgetts(phrase, voice_name, fallback=False, cancel=cancel,
+                                                 cache_file=cache_file)
+            done += len(entries)
+            if progress:
+                progress(done, len(pending))
+        return cache_files
+    
+    def should_segment(self, text):
+        """Check whether a text is long enough to be cached sentence by sentence"""
+        return len(text) >= self.segment_min_chars and len(split_sentences(text)) > 1
+    
+    def get_segment_file(self, sentence, voice_name):
+        """Return the cache path for one sentence of a long text"""
+        digest = hashlib.sha1(f"{voice_name}\n{sentence}".encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.segments_dir, f"{digest}.mp3")
+    
+    def generate_speech_segmented(self, text, voice_name, fallback=True, cancel=NO_CANCEL):
+        """Speak a long text from per-sentence cache entries, synthesizing only the sentences not cached yet"""
+        sentences = split_sentences(text)
+        digest = hashlib.sha1(f"{voice_name}\n{text}".encode('utf-8')).hexdigest()[:20]
+        script_file = os.path.join(self.segments_dir, f"script-{digest}.wav")
+        
+        with self.tracer.span('synthesize_segmented', voice=voice_name, text_len=len(text),
+                              sentences=len(sentences)) as span:
+            if self.is_cache_hit(script_file):
+                span.set(cache='hit')
+                os.utime(script_file)  # Keep recently played scripts from being pruned
+                return script_file
+            
+            segment_files = [self.get_segment_file(s, voice_name) for s in sentences]
+            missing = [s for s, f in zip(sentences, segment_files) if not self.is_cache_hit(f)]
+            span.set(cache='partial' if len(missing) < len(sentences) else 'miss', changed=len(missing))
+            print(f"Long text: {len(sentences)} sentences, {len(missing)} to synthesize")
+            
+            if missing:
+                try:
+                    self.generate_speech_batch(missing, voice_name, cache_file_for=self.get_segment_file,
+                                               cancel=cancel)
+                except (ValueError, TypeError, Cancelled):
+                    raise
+                except Exception as e:
+                    if not fallback:
+                        raise
+                    span.set(fallback='local')
+                    print(f"Speech service failed ({e}), trying the local voice")
+                    return self.generate_speech_local(text)
+            cancel.check()
+            
+            # Stitch the sentences back together, crossfading each join
+            with self.tracer.span('stitch', sentences=len(sentences)):
+                parts, rate = [], None
+                for segment_file in segment_files:
+                    cancel.check()
+                    data, sr = sf.read(segment_file, dtype='float32')
+                    if len(data.shape) > 1:
+                        data = data.mean(axis=1)
+                    rate = rate or sr
+                    parts.append(resample(data, sr, rate))
+                audio = crossfade_concat(parts, int(rate * self.segment_crossfade_ms / 1000))
+                with self.cache_lock(script_file):
+                    with atomic_path(script_file) as temp_path:
+                        sf.write(temp_path, audio, rate, format='WAV')
+            
+            self.prune_scripts()
+            return script_file
+    
+    def prune_scripts(self):
+        """Delete stitched long texts beyond the most recently played ones (their sentences stay cached)"""
+        scripts = []
+        for name in os.listdir(self.segments_dir):
+            if name.startswith("script-") and name.endswith(".wav"):
+                path = os.path.join(self.segments_dir, name)
+                try:
+                    scripts.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        for _, path in sorted(scripts, reverse=True)[self.max_scripts:]:
+            # Rate/pitch variants and pre-rendered device copies go with the script
+            stem = os.path.splitext(os.path.basename(path))[0]
+            derived = [os.path.join(self.variants_dir, name) for name in os.listdir(self.variants_dir)
+                       if name.startswith(f"{stem}@")]
+            derived += [os.path.join(self.native_dir, name) for name in os.listdir(self.native_dir)
+                        if name.startswith((f"segments-{stem}@", f"variants-{stem}@"))]
+            for victim in [path] + derived:
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+    
+    def _synthesize_batch(self, batch, voice_name, fade_ms=5, cancel=NO_CANCEL):
+        """Synthesize a batch as one request and cut it at the phrase boundaries"""
+        import numpy as np
+        
+        # End every phrase with a full stop so the service pauses between them
+        text = "\n".join(
+            phrase if phrase.rstrip()[-1:] in '.!?…' else phrase.rstrip() + '.'
+            for phrase, _ in batch
+        )
+        with self.tracer.span('synthesize_batch', voice=voice_name, phrases=len(batch),
+                              text_len=len(text)):
+            audio_bytes, boundaries = self.synthesize_edgetts(text, voice_name, word_boundaries=True,
+                                                              cancel=cancel)
+            data, sr = sf.read(io.BytesIO(audio_bytes), dtype='float32')
+            if data.ndim > 1:
+                data = data.mean(axis=1)
+            
+            spans = self._phrase_spans([phrase for phrase, _ in batch], boundaries)
+            
+            # Cut halfway through the pause between consecutive phrases
+            cuts = [0]
+            for (_, end), (next_start, _) in zip(spans, spans[1:]):
+                cuts.append(int((end + next_start) / 2 * sr))
+            cuts.append(len(data))
+            
+            fade = np.linspace(0.0, 1.0, max(1, int(sr * fade_ms / 1000)), dtype=np.float32)
+            for (phrase, cache_file), start, end in zip(batch, cuts, cuts[1:]):
+                segment = data[start:end].copy()
+                n = min(len(fade), len(segment) // 2)
+                if n:
+                    segment[:n] *= fade[:n]
+                    segment[-n:] *= fade[:n][::-1]
+                with atomic_path(cache_file) as temp_path:
+                    sf.write(temp_path, segment, sr, format='MP3')
+                self.write_peaks(cache_file, segment, sr)
+    
+    @staticmethod
+    def _phrase_spans(phrases, boundaries):
+        """Map word boundary events back to [(start, end)] seconds per phrase"""
+        def letters(text):
+            return re.sub(r'\W+', '', text).lower()
         
-        # Run async function
-        asyncio.run(_generate())
-        return cache_file
+        spans = []
+        words = iter(boundaries)
+        for phrase in phrases:
+            remaining = letters(phrase)
+            start = end = None
+            while remaining:
+                word_start, word_end, word = next(words, (None, None, None))
+                if word is None:
+                    raise ValueError("ran out of word boundaries")
+                word = letters(word)
+                if not word:
+                    continue
+                if not remaining.startswith(word):
+                    raise ValueError(f"unexpected word {word!r}")
+                remaining = remaining[len(word):]
+                start = word_start if start is None else start
+                end = word_end
+            if start is None:
+                raise ValueError(f"no words for phrase {phrase!r}")
+            spans.append((start, end))
+        return spans
     
     def get_colors(self):
         return self.dark_colors if self.dark_mode.get() else self.light_colors
@@ -241,6 +2577,19 @@ class TTSApp:
         self.stop_btn.config(command=self.stop_playback)
         self.stop_btn.pack(side='left')
         
+        # Batch cache button
+        self.batch_btn = tk.Button(
+            control_frame,
+            text="⚡ Batch",
+            font=('Segoe UI', 10),
+            relief='flat',
+            cursor='hand2',
+            width=8,
+            height=2
+        )
+        self.batch_btn.config(command=self.cache_lines)
+        self.batch_btn.pack(side='left', padx=(10, 0))
+        
         # Options button
         self.options_btn = tk.Button(
             control_frame, 
@@ -289,12 +2638,112 @@ class TTSApp:
         )
         self.volume_label.pack(side='left', padx=(10, 0))
         
+        # Rate and pitch controls (applied to the cached audio, no new synthesis)
+        delivery_frame = tk.Frame(self.main_frame)
+        delivery_frame.pack(fill='x', padx=20, pady=(0, 10))
+        
+        rate_label = tk.Label(
+            delivery_frame,
+            text="Rate:",
+            font=('Segoe UI', 10)
+        )
+        rate_label.pack(side='left', padx=(0, 5))
+        
+        self.rate_slider = tk.Scale(
+            delivery_frame,
+            from_=50,
+            to=200,
+            orient='horizontal',
+            command=self.on_rate_change,
+            showvalue=False,
+            length=90,
+            resolution=5
+        )
+        self.rate_slider.set(100)
+        self.rate_slider.pack(side='left', fill='x', expand=True)
+        
+        self.rate_value_label = tk.Label(
+            delivery_frame,
+            text="100%",
+            font=('Segoe UI', 10),
+            width=5
+        )
+        self.rate_value_label.pack(side='left', padx=(5, 10))
+        
+        pitch_label = tk.Label(
+            delivery_frame,
+            text="Pitch:",
+            font=('Segoe UI', 10)
+        )
+        pitch_label.pack(side='left', padx=(0, 5))
+        
+        self.pitch_slider = tk.Scale(
+            delivery_frame,
+            from_=-12,
+            to=12,
+            orient='horizontal',
+            command=self.on_pitch_change,
+            showvalue=False,
+            length=90,
+            resolution=1
+        )
+        self.pitch_slider.set(0)
+        self.pitch_slider.pack(side='left', fill='x', expand=True)
+        
+        self.pitch_value_label = tk.Label(
+            delivery_frame,
+            text="+0 st",
+            font=('Segoe UI', 10),
+            width=5
+        )
+        self.pitch_value_label.pack(side='left', padx=(5, 0))
+        
+        # Playback queue
+        queue_frame = tk.Frame(self.main_frame)
+        queue_frame.pack(fill='x', padx=20, pady=(0, 10))
+        
+        self.queue_listbox = tk.Listbox(
+            queue_frame,
+            font=('Segoe UI', 9),
+            height=4
+        )
+        self.queue_listbox.pack(side='left', fill='x', expand=True)
+        
+        queue_buttons = tk.Frame(queue_frame)
+        queue_buttons.pack(side='left', padx=(10, 0))
+        
+        self.skip_btn = tk.Button(
+            queue_buttons,
+            text="⏭ Skip",
+            font=('Segoe UI', 9),
+            relief='flat',
+            cursor='hand2',
+            width=8,
+            command=self.skip_current
+        )
+        self.skip_btn.pack(pady=(0, 5))
+        
+        self.clear_btn = tk.Button(
+            queue_buttons,
+            text="🧹 Clear",
+            font=('Segoe UI', 9),
+            relief='flat',
+            cursor='hand2',
+            width=8,
+            command=self.clear_queue
+        )
+        self.clear_btn.pack()
+        
         # Store widgets for theme updating
         self.main_widgets = [
             title_label, text_label, self.text_box, 
             text_frame, self.play_btn, self.stop_btn, 
             self.options_btn, control_frame, volume_frame,
-            volume_label, self.volume_label
+            volume_label, self.volume_label, self.batch_btn,
+            queue_frame, queue_buttons, self.queue_listbox,
+            self.skip_btn, self.clear_btn, delivery_frame,
+            rate_label, self.rate_slider, self.rate_value_label,
+            pitch_label, self.pitch_slider, self.pitch_value_label
         ]
     
     def on_volume_change(self, value):
@@ -306,6 +2755,20 @@ class TTSApp:
         print(f"Volume changed to: {vol_percent}% (multiplier: {self.volume.get()})")
         self.save_settings()
     
+    def on_rate_change(self, value):
+        """Update speaking rate when slider changes"""
+        rate_percent = int(float(value))
+        self.rate_value_label.config(text=f"{rate_percent}%")
+        self.speech_rate = rate_percent / 100.0
+        self.save_settings()
+    
+    def on_pitch_change(self, value):
+        """Update pitch shift when slider changes"""
+        semitones = int(float(value))
+        self.pitch_value_label.config(text=f"{semitones:+d} st")
+        self.speech_pitch = semitones
+        self.save_settings()
+    
     def create_options_frame(self):
         self.options_frame = tk.Frame(self.root)
         
@@ -325,6 +2788,32 @@ class TTSApp:
         )
         voice_label.pack(pady=(5, 3), padx=25, anchor='w')
         
+        # Voice filters (locale and gender)
+        filter_frame = tk.Frame(self.options_frame)
+        filter_frame.pack(fill='x', pady=(0, 5), padx=25)
+        
+        self.locale_filter = ttk.Combobox(
+            filter_frame,
+            values=["All"] + sorted(self.voices_by_locale),
+            state='readonly',
+            font=('Segoe UI', 9),
+            width=12
+        )
+        self.locale_filter.set("All")
+        self.locale_filter.bind('<<ComboboxSelected>>', self.on_voice_filter)
+        self.locale_filter.pack(side='left')
+        
+        self.gender_filter = ttk.Combobox(
+            filter_frame,
+            values=["All", "Female", "Male"],
+            state='readonly',
+            font=('Segoe UI', 9),
+            width=8
+        )
+        self.gender_filter.set("All")
+        self.gender_filter.bind('<<ComboboxSelected>>', self.on_voice_filter)
+        self.gender_filter.pack(side='left', padx=(10, 0))
+        
         self.voice_dropdown = ttk.Combobox(
             self.options_frame, 
             values=[v['name'] for v in self.voices], 
@@ -332,8 +2821,8 @@ class TTSApp:
             font=('Segoe UI', 9),
             width=45
         )
-        self.voice_dropdown.current(0)
         self.voice_dropdown.pack(pady=(0, 10), padx=25)
+        self.filter_voices()
         
         # Output device 1
         output1_label = tk.Label(
@@ -399,6 +2888,65 @@ class TTSApp:
         )
         self.dark_check.pack(side='left', padx=10)
         
+        # Tracing checkbox
+        self.tracing_check = tk.Checkbutton(
+            checkbox_frame,
+            text="📈 Tracing",
+            variable=self.tracing_var,
+            command=self.toggle_tracing,
+            font=('Segoe UI', 10),
+            cursor='hand2'
+        )
+        self.tracing_check.pack(side='left', padx=10)
+        
+        # Output effects
+        effects_label = tk.Label(
+            self.options_frame,
+            text="Effects:",
+            font=('Segoe UI', 10, 'bold')
+        )
+        effects_label.pack(pady=(5, 3), padx=25, anchor='w')
+        
+        effects_frame = tk.Frame(self.options_frame)
+        effects_frame.pack(fill='x', padx=25)
+        
+        self.effect_checks = []
+        for name, text in (('eq', "EQ"), ('compressor', "Compressor"), ('radio', "Radio"), ('reverb', "Reverb")):
+            check = tk.Checkbutton(
+                effects_frame,
+                text=text,
+                variable=self.effect_vars[name],
+                command=self.save_settings,
+                font=('Segoe UI', 10),
+                cursor='hand2'
+            )
+            check.pack(side='left', padx=(0, 10))
+            self.effect_checks.append(check)
+        
+        # Per-output bypass, e.g. effects on the cable while the monitor stays dry
+        effects_outputs_frame = tk.Frame(self.options_frame)
+        effects_outputs_frame.pack(fill='x', padx=25, pady=(0, 10))
+        
+        self.fx_output1_check = tk.Checkbutton(
+            effects_outputs_frame,
+            text="On Output 1",
+            variable=self.fx_output1_var,
+            command=self.save_settings,
+            font=('Segoe UI', 10),
+            cursor='hand2'
+        )
+        self.fx_output1_check.pack(side='left', padx=(0, 10))
+        
+        self.fx_output2_check = tk.Checkbutton(
+            effects_outputs_frame,
+            text="On Output 2",
+            variable=self.fx_output2_var,
+            command=self.save_settings,
+            font=('Segoe UI', 10),
+            cursor='hand2'
+        )
+        self.fx_output2_check.pack(side='left')
+        
         # Buttons frame
         buttons_frame = tk.Frame(self.options_frame)
         buttons_frame.pack(pady=10)
@@ -416,6 +2964,19 @@ class TTSApp:
         self.soundboard_btn.config(command=self.open_soundboard)
         self.soundboard_btn.pack(side='left', padx=5)
         
+        # Stats button
+        self.stats_btn = tk.Button(
+            buttons_frame,
+            text="📊 Stats",
+            font=('Segoe UI', 10, 'bold'),
+            relief='flat',
+            cursor='hand2',
+            width=10,
+            height=2
+        )
+        self.stats_btn.config(command=self.open_stats)
+        self.stats_btn.pack(side='left', padx=5)
+        
         # Back button
         self.back_btn = tk.Button(
             buttons_frame, 
@@ -423,7 +2984,7 @@ class TTSApp:
             font=('Segoe UI', 10, 'bold'),
             relief='flat',
             cursor='hand2',
-            width=15,
+            width=10,
             height=2
         )
         self.back_btn.config(command=self.close_options)
@@ -431,9 +2992,12 @@ class TTSApp:
         
         # Store widgets for theme updating
         self.options_widgets = [
-            options_title, voice_label, output1_label, 
+            options_title, voice_label, output1_label, filter_frame,
             output2_label, self.stay_check, self.dark_check,
-            self.back_btn, checkbox_frame, buttons_frame, self.soundboard_btn
+            self.back_btn, checkbox_frame, buttons_frame, self.soundboard_btn,
+            self.tracing_check, self.stats_btn, effects_label, effects_frame,
+            effects_outputs_frame, self.fx_output1_check, self.fx_output2_check,
+            *self.effect_checks
         ]
     
     def create_soundboard_frame(self):
@@ -460,23 +3024,119 @@ class TTSApp:
         list_frame = tk.Frame(self.soundboard_frame)
         list_frame.pack(fill='both', expand=True, padx=20, pady=(0, 10))
         
-        # Scrollbar
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side='right', fill='y')
+        # Scrollbar
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side='right', fill='y')
+        
+        # Listbox for sounds
+        self.sounds_listbox = tk.Listbox(
+            list_frame,
+            font=('Segoe UI', 9),
+            yscrollcommand=scrollbar.set,
+            height=10
+        )
+        self.sounds_listbox.pack(side='left', fill='both', expand=True)
+        scrollbar.config(command=self.sounds_listbox.yview)
+        
+        # Buttons frame
+        buttons_frame = tk.Frame(self.soundboard_frame)
+        buttons_frame.pack(pady=10)
+        
+        # Refresh button
+        refresh_btn = tk.Button(
+            buttons_frame,
+            text="🔄 Refresh",
+            font=('Segoe UI', 10),
+            relief='flat',
+            cursor='hand2',
+            width=12,
+            height=2,
+            command=self.refresh_soundboard_list
+        )
+        refresh_btn.pack(side='left', padx=5)
+        
+        # Import library button
+        self.import_btn = tk.Button(
+            buttons_frame,
+            text="📥 Import",
+            font=('Segoe UI', 10),
+            relief='flat',
+            cursor='hand2',
+            width=12,
+            height=2,
+            command=self.import_library
+        )
+        self.import_btn.pack(side='left', padx=5)
+        
+        # Assign hotkey button
+        self.assign_btn = tk.Button(
+            buttons_frame,
+            text="⌨ Assign Key",
+            font=('Segoe UI', 10, 'bold'),
+            relief='flat',
+            cursor='hand2',
+            width=15,
+            height=2,
+            command=self.assign_hotkey
+        )
+        self.assign_btn.pack(side='left', padx=5)
+        
+        # Import status
+        self.import_status = tk.Label(
+            self.soundboard_frame,
+            text="",
+            font=('Segoe UI', 9)
+        )
+        self.import_status.pack()
+        
+        # Back button
+        back_btn = tk.Button(
+            self.soundboard_frame,
+            text="← Back to Options",
+            font=('Segoe UI', 10, 'bold'),
+            relief='flat',
+            cursor='hand2',
+            width=20,
+            height=2,
+            command=self.close_soundboard
+        )
+        back_btn.pack(pady=10)
+        
+        # Store widgets for theme
+        self.soundboard_widgets = [
+            soundboard_title, instructions, list_frame,
+            self.sounds_listbox, buttons_frame, refresh_btn,
+            self.assign_btn, back_btn, self.import_btn, self.import_status
+        ]
+        
+        # Initial refresh
+        self.refresh_soundboard_list()
+    
+    def create_stats_frame(self):
+        self.stats_frame = tk.Frame(self.root)
+        
+        # Title
+        stats_title = tk.Label(
+            self.stats_frame,
+            text="📊 Stats",
+            font=('Segoe UI', 16, 'bold')
+        )
+        stats_title.pack(pady=(15, 10))
         
-        # Listbox for sounds
-        self.sounds_listbox = tk.Listbox(
-            list_frame,
-            font=('Segoe UI', 9),
-            yscrollcommand=scrollbar.set,
-            height=10
+        # Stats text
+        self.stats_text = tk.Text(
+            self.stats_frame,
+            height=14,
+            wrap='none',
+            font=('Consolas', 9),
+            relief='flat',
+            borderwidth=2
         )
-        self.sounds_listbox.pack(side='left', fill='both', expand=True)
-        scrollbar.config(command=self.sounds_listbox.yview)
+        self.stats_text.pack(fill='both', expand=True, padx=20, pady=(0, 10))
         
         # Buttons frame
-        buttons_frame = tk.Frame(self.soundboard_frame)
-        buttons_frame.pack(pady=10)
+        buttons_frame = tk.Frame(self.stats_frame)
+        buttons_frame.pack(pady=(0, 5))
         
         # Refresh button
         refresh_btn = tk.Button(
@@ -487,144 +3147,478 @@ class TTSApp:
             cursor='hand2',
             width=12,
             height=2,
-            command=self.refresh_soundboard_list
+            command=self.refresh_stats
         )
         refresh_btn.pack(side='left', padx=5)
         
-        # Assign hotkey button
-        self.assign_btn = tk.Button(
+        # Reset button
+        reset_btn = tk.Button(
             buttons_frame,
-            text="⌨ Assign Key",
-            font=('Segoe UI', 10, 'bold'),
+            text="🗑 Reset",
+            font=('Segoe UI', 10),
             relief='flat',
             cursor='hand2',
-            width=15,
+            width=12,
             height=2,
-            command=self.assign_hotkey
+            command=self.reset_stats
         )
-        self.assign_btn.pack(side='left', padx=5)
+        reset_btn.pack(side='left', padx=5)
+        
+        # Profiling checkbox
+        self.profiling_check = tk.Checkbutton(
+            buttons_frame,
+            text="🧪 Profiling",
+            variable=self.profiling_var,
+            command=self.toggle_profiling,
+            font=('Segoe UI', 10),
+            cursor='hand2'
+        )
+        self.profiling_check.pack(side='left', padx=5)
         
         # Back button
         back_btn = tk.Button(
-            self.soundboard_frame,
+            self.stats_frame,
             text="← Back to Options",
             font=('Segoe UI', 10, 'bold'),
             relief='flat',
             cursor='hand2',
             width=20,
             height=2,
-            command=self.close_soundboard
+            command=self.close_stats
         )
-        back_btn.pack(pady=10)
+        back_btn.pack(pady=(5, 10))
         
         # Store widgets for theme
-        self.soundboard_widgets = [
-            soundboard_title, instructions, list_frame,
-            self.sounds_listbox, buttons_frame, refresh_btn,
-            self.assign_btn, back_btn
+        self.stats_widgets = [
+            stats_title, self.stats_text, buttons_frame,
+            refresh_btn, reset_btn, back_btn, self.profiling_check
         ]
+    
+    def get_stats_report(self):
+        """Build the text shown in the stats view"""
+        lines = []
+        if not self.tracer.enabled:
+            lines.append("Tracing is off (enable it in Options).")
+            lines.append("")
         
-        # Initial refresh
-        self.refresh_soundboard_list()
+        lines.append("Latency (ms)")
+        lines.append(f"{'stage':<16}{'count':>6}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+        for name, st in sorted(self.tracer.stats().items()):
+            lines.append(
+                f"{name:<16}{st['count']:>6}{st['p50']:>9.1f}{st['p90']:>9.1f}"
+                f"{st['p99']:>9.1f}{st['max']:>9.1f}"
+            )
+        
+        lines.append("")
+        lines.append("Speech service")
+        lines.append(f"  state {self.breaker.state}  failures {self.breaker.failures}"
+                     f"  trips {self.breaker.trips}  retries {self.backend_retry_count}")
+        lines.append(f"  rate limit {self.rate_limiter.rate:g}/s (burst {self.rate_limiter.burst})"
+                     f"  waits {self.rate_limiter.waits} ({self.rate_limiter.wait_seconds:.1f}s)")
+        
+        lines.append("")
+        lines.append("Clip variants")
+        lines.append(f"  pre-rendered {len(os.listdir(self.native_dir))}  used {self.player.prepared_hits}"
+                     f"  resampled at play time {self.player.resamples}")
+        
+        lines.append("")
+        lines.append("Memory and CPU")
+        if self.profiler.enabled:
+            lines.append(f"  full reports every {self.profiler.interval:g}s in {self.profiler.report_file}")
+            lines.extend(self.profiler.summary())
+        else:
+            lines.append("  Profiling is off (enable it below or with TTS_PROFILE=1).")
+        
+        lines.append("")
+        lines.append("Audio devices")
+        for index, st in sorted(self.player.get_stats().items()):
+            lines.append(f"[{index}] {st['name'][:40]}")
+            lines.extend(self._format_audio_stats(st))
+        return "\n".join(lines)
+    
+    def _format_audio_stats(self, st):
+        """Format one device's output health counters"""
+        requested = st['latency_requested'] if st['latency_requested'] is not None else 'default'
+        return [
+            f"  {st['samplerate']:.0f} Hz x{st['channels']}  blocksize {st['blocksize'] or 'auto'}"
+            f"  blocks {st['block_min']}-{st['block_max']} (last {st['block_last']})",
+            f"  latency requested {requested}, reported {st['latency_reported_ms']:.1f} ms,"
+            f" at DAC {st['dac_latency_ms']:.1f} ms (max {st['dac_latency_max_ms']:.1f})",
+            f"  callbacks {st['callbacks']}  underflows {st['underflows']}  overflows {st['overflows']}",
+            f"  callback ms avg {st['callback_ms_avg']:.3f}  p99 {st['callback_ms_p99']:.3f}"
+            f"  max {st['callback_ms_max']:.3f}",
+            f"  sync lead {st['sync_lead_ms']:.1f} ms  drift {st['drift_ms']:+.2f} ms"
+            f" (max {st['drift_ms_max']:.2f})  corrections {st['drift_corrections']}",
+            f"  stream starved {st['starved']}",
+            f"  effects {st['effects'] or 'off'}  blocks {st['effects_blocks']}"
+            f"  ms avg {st['effects_ms_avg']:.3f}  max {st['effects_ms_max']:.3f}"
+            f"  ({st['effects_load_max'] * 100:.0f}% of a block at worst)"
+        ]
+    
+    def _audio_stats_logger(self):
+        """Print audio health lines for active devices every audio_stats_interval seconds"""
+        last_callbacks = {}
+        while True:
+            time.sleep(self.audio_stats_interval)
+            for index, st in sorted(self.player.get_stats().items()):
+                if st['callbacks'] == last_callbacks.get(index):
+                    continue
+                last_callbacks[index] = st['callbacks']
+                print(f"Audio stats [{index}] {st['name']}: "
+                      f"underflows={st['underflows']} overflows={st['overflows']} "
+                      f"callback_ms avg={st['callback_ms_avg']:.3f} max={st['callback_ms_max']:.3f} "
+                      f"blocks={st['block_min']}-{st['block_max']} "
+                      f"latency={st['latency_reported_ms']:.1f}ms dac={st['dac_latency_ms']:.1f}ms")
+    
+    def refresh_stats(self):
+        """Refresh the stats view"""
+        self.stats_text.config(state='normal')
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert("1.0", self.get_stats_report())
+        self.stats_text.config(state='disabled')
+    
+    def reset_stats(self):
+        self.tracer.reset()
+        self.player.reset_stats()
+        self.profiler.reset()
+        self.refresh_stats()
+    
+    def open_stats(self):
+        """Open stats view"""
+        self.options_frame.pack_forget()
+        self.stats_frame.pack(fill='both', expand=True)
+        self.refresh_stats()
+    
+    def close_stats(self):
+        """Close stats view and return to options"""
+        self.stats_frame.pack_forget()
+        self.options_frame.pack(fill='both', expand=True)
+    
+    def toggle_tracing(self):
+        self.tracer.enabled = self.tracing_var.get()
+        if not self.tracer.enabled:
+            self.tracer.close()
+        self.save_settings()
+    
+    def toggle_profiling(self):
+        if self.profiling_var.get():
+            self.profiler.start()
+        else:
+            self.profiler.stop()
+        self.save_settings()
+        self.refresh_stats()
     
     def refresh_soundboard_list(self):
         """Refresh the list of cached sounds"""
         self.sounds_listbox.delete(0, tk.END)
+        self.sound_files = []
         
         if not os.path.exists(self.cache_dir):
             return
         
         # Get all mp3 files in cache
         cache_files = [f for f in os.listdir(self.cache_dir) if f.endswith('.mp3')]
+        hotkeys = {path: key for key, path in self.soundboard_bindings.items()}
         
+        missing = []
         for filename in sorted(cache_files):
             filepath = os.path.join(self.cache_dir, filename)
-            # Check if this file has a hotkey assigned
-            hotkey = None
-            for key, path in self.soundboard_bindings.items():
-                if path == filepath:
-                    hotkey = key
-                    break
             
-            # Display format: "filename [Hotkey: F1]" or just "filename"
+            # Display format: "filename  ▂▅▇▃  0:04  [Key: f1]"
             display_name = filename[:-4]  # Remove .mp3
+            thumbnail = self.get_thumbnail(filepath)
+            if thumbnail:
+                sparkline, duration = thumbnail
+                minutes, seconds = divmod(int(round(duration)), 60)
+                display_name += f"  {sparkline}  {minutes}:{seconds:02d}"
+            else:
+                missing.append(filepath)
+            hotkey = hotkeys.get(filepath)
             if hotkey:
-                display_name += f" [Key: {hotkey}]"
+                display_name += f"  [Key: {hotkey}]"
             
             self.sounds_listbox.insert(tk.END, display_name)
+            self.sound_files.append(filepath)
+        
+        # Entries cached before sidecars existed get them in the background
+        if missing and not self.peaks_running:
+            self.peaks_running = True
+            threading.Thread(target=self._peaks_thread, args=(missing,), daemon=True).start()
     
-    def assign_hotkey(self):
-        """Assign a hotkey to the selected sound"""
-        selection = self.sounds_listbox.curselection()
-        if not selection:
+    def peaks_file(self, audio_file):
+        """Return the path of a cache entry's peak sidecar"""
+        return os.path.join(self.peaks_dir, os.path.basename(audio_file) + ".npz")
+    
+    def write_peaks(self, audio_file, data=None, sr=None):
+        """Compute and store a cache entry's peak sidecar (decoding the entry if no audio is given)"""
+        try:
+            if data is None:
+                data, sr = sf.read(audio_file, dtype='float32')
+                if data.ndim > 1:
+                    data = data.mean(axis=1)
+            save_peaks(self.peaks_file(audio_file), data, sr)
+        except Exception as e:
+            print(f"Error computing peaks for {os.path.basename(audio_file)}: {e}")
+    
+    def get_thumbnail(self, audio_file):
+        """Return (sparkline, duration) from an entry's sidecar, or None if it is missing or out of date"""
+        try:
+            sidecar_mtime = os.stat(self.peaks_file(audio_file)).st_mtime_ns
+            if sidecar_mtime < os.stat(audio_file).st_mtime_ns:
+                return None
+        except OSError:
+            return None
+        
+        cached = self.thumbnails.get(audio_file)
+        if cached and cached[0] == sidecar_mtime:
+            return cached[1:]
+        try:
+            sparkline, duration = peak_sparkline(self.peaks_file(audio_file))
+        except Exception as e:
+            print(f"Error reading peaks for {os.path.basename(audio_file)}: {e}")
+            return None
+        self.thumbnails[audio_file] = (sidecar_mtime, sparkline, duration)
+        return sparkline, duration
+    
+    def _peaks_thread(self, files):
+        try:
+            for audio_file in files:
+                self.write_peaks(audio_file)
+        finally:
+            self.peaks_running = False
+            self.root.after(0, self.refresh_soundboard_list)
+    
+    def load_cache_index(self):
+        """Load the cache index ({filename: entry info}) from file"""
+        if os.path.exists(self.cache_index_file):
+            try:
+                with open(self.cache_index_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading cache index: {e}")
+        return {}
+    
+    def save_cache_index(self, index):
+        """Save the cache index to file"""
+        try:
+            atomic_write(self.cache_index_file, json.dumps(index, indent=2).encode('utf-8'))
+        except Exception as e:
+            print(f"Error saving cache index: {e}")
+    
+    def update_cache_index(self, entries):
+        """Merge entries into the cache index, re-reading it under the lock so other instances' entries survive"""
+        try:
+            with self.cache_lock(self.cache_index_file):
+                index = self.load_cache_index()
+                index.update(entries)
+                self.save_cache_index(index)
+        except TimeoutError as e:
+            print(f"Error saving cache index: {e}")
+    
+    def cache_lock(self, path):
+        """Return the cross-process lock guarding a cache file"""
+        return FileLock(os.path.join(self.locks_dir, os.path.basename(path) + ".lock"),
+                        timeout=self.lock_timeout)
+    
+    def lock_entries(self, cache_files, cancel=NO_CANCEL):
+        """Lock several cache entries, in sorted order so instances can't deadlock; returns the held locks"""
+        held = []
+        try:
+            for cache_file in sorted(set(cache_files)):
+                lock = self.cache_lock(cache_file)
+                if lock.acquire(cancel):
+                    held.append(lock)
+                else:
+                    print(f"Cache entry still locked after {self.lock_timeout:.0f}s, "
+                          f"synthesizing anyway: {os.path.basename(cache_file)}")
+        except Cancelled:
+            for lock in held:
+                lock.release()
+            raise
+        return held
+    
+    def is_cache_hit(self, cache_file):
+        """Check that a cache entry exists and is complete, discarding damaged ones"""
+        try:
+            st = os.stat(cache_file)
+        except OSError:
+            return False
+        key = (st.st_mtime_ns, st.st_size)
+        if self.verified_entries.get(cache_file) == key:
+            return True
+        if is_valid_audio(cache_file):
+            self.verified_entries[cache_file] = key
+            return True
+        
+        print(f"Discarding damaged cache entry: {os.path.basename(cache_file)}")
+        try:
+            os.remove(cache_file)
+        except OSError:
+            pass
+        return False
+    
+    def import_library(self):
+        """Ask for a folder and import its audio files into the soundboard cache"""
+        from tkinter import filedialog
+        
+        if self.import_running:
+            return
+        src_dir = filedialog.askdirectory(title="Import audio library")
+        if not src_dir:
             return
         
-        idx = selection[0]
-        display_name = self.sounds_listbox.get(idx)
+        self.import_running = True
+        self.import_btn.config(state='disabled')
+        threading.Thread(target=self._import_thread, args=(src_dir,), daemon=True).start()
+    
+    def _import_thread(self, src_dir):
+        def report(progress):
+            text = (f"Imported {progress['imported']}, skipped {progress['skipped']}, "
+                    f"failed {progress['failed']} of {progress['total']}  "
+                    f"({progress['files_per_sec']:.1f} files/s, {progress['mb_per_sec']:.1f} MB/s)")
+            self.root.after(0, lambda: self.import_status.config(text=text))
         
-        # Extract filename (remove hotkey info if present)
-        if " [Key: " in display_name:
-            filename = display_name.split(" [Key: ")[0] + ".mp3"
-            # Also remove the old binding
-            old_key = display_name.split(" [Key: ")[1].rstrip(']')
-            if old_key in self.soundboard_bindings:
-                del self.soundboard_bindings[old_key]
-        else:
-            filename = display_name + ".mp3"
+        try:
+            self.import_audio_library(src_dir, report)
+        except Exception as e:
+            print(f"Error importing library: {e}")
+            message = f"Import failed: {e}"
+            self.root.after(0, lambda: self.import_status.config(text=message))
+        finally:
+            self.import_running = False
+            self.root.after(0, lambda: self.import_btn.config(state='normal'))
+            self.root.after(0, self.refresh_soundboard_list)
+    
+    def import_audio_library(self, src_dir, progress=None):
+        """Import every audio file under src_dir into the cache using a process pool"""
+        sources = []
+        for folder, _, names in os.walk(src_dir):
+            for name in sorted(names):
+                if name.lower().endswith(IMPORT_EXTENSIONS):
+                    sources.append(os.path.abspath(os.path.join(folder, name)))
         
-        filepath = os.path.join(self.cache_dir, filename)
+        index = self.load_cache_index()
+        imported = {}  # Entries added by this import, merged into the index at the end
+        known_hashes = frozenset(
+            entry['hash'] for name, entry in index.items()
+            if entry.get('hash') and os.path.exists(os.path.join(self.cache_dir, name))
+        )
+        by_source = {entry['source']: name for name, entry in index.items() if entry.get('source')}
         
-        # Show waiting dialog
-        self.assign_btn.config(text="Press key...")
-        self.root.update()
+        # Pick a cache filename for each source (re-imports keep their old name)
+        taken = set(os.listdir(self.cache_dir)) | set(by_source.values())
+        jobs = []
+        for src_path in sources:
+            filename = by_source.get(src_path)
+            if filename is None:
+                rel = os.path.splitext(os.path.relpath(src_path, src_dir))[0]
+                base = self.sanitize_filename(rel.replace(os.sep, ' - ')) or "sound"
+                filename = f"{base}.mp3"
+                counter = 2
+                while filename in taken:
+                    filename = f"{base} ({counter}).mp3"
+                    counter += 1
+                taken.add(filename)
+            dest_path = os.path.join(self.cache_dir, filename)
+            try:
+                planned_mtime = os.stat(dest_path).st_mtime_ns
+            except OSError:
+                planned_mtime = None
+            jobs.append((src_path, dest_path, self.peaks_file(filename),
+                         self.cache_lock(dest_path).path, planned_mtime, self.lock_timeout))
         
-        # Wait for key press
-        pressed_key = self.wait_for_keypress()
+        summary = {'total': len(jobs), 'imported': 0, 'skipped': 0, 'failed': 0,
+                   'bytes': 0, 'audio_seconds': 0.0, 'files_per_sec': 0.0, 'mb_per_sec': 0.0}
+        if not jobs:
+            if progress:
+                progress(summary)
+            return summary
         
-        if pressed_key and pressed_key != "esc":
-            # Remove any existing binding with this key
-            if pressed_key in self.soundboard_bindings:
-                del self.soundboard_bindings[pressed_key]
-            
-            # Add new binding
-            self.soundboard_bindings[pressed_key] = filepath
-            self.save_soundboard()
-            self.restart_hotkey_listener()
-        elif pressed_key == "esc":
-            # ESC removes the binding for this sound
-            for key, path in list(self.soundboard_bindings.items()):
-                if path == filepath:
-                    del self.soundboard_bindings[key]
-            self.save_soundboard()
-            self.restart_hotkey_listener()
+        workers = max(1, min(os.cpu_count() or 1, len(jobs)))
+        print(f"Importing {len(jobs)} files from {src_dir} with {workers} workers")
+        started = time.perf_counter()
+        with self.tracer.span('import', files=len(jobs), workers=workers) as span:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_import_worker,
+                                     initargs=(known_hashes,)) as pool:
+                futures = [pool.submit(_import_audio_file, *job) for job in jobs]
+                for done, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    summary[result['status']] += 1
+                    summary['bytes'] += result.get('bytes', 0)
+                    if result['status'] == 'imported':
+                        summary['audio_seconds'] += result['duration']
+                        imported[result['file']] = {
+                            'source': result['source'],
+                            'hash': result['hash'],
+                            'duration': round(result['duration'], 3),
+                            'samplerate': result['samplerate'],
+                            'imported': time.time()
+                        }
+                    elif result['status'] == 'failed':
+                        print(f"Error importing {result['source']}: {result.get('error')}")
+                    
+                    elapsed = max(time.perf_counter() - started, 1e-6)
+                    summary['files_per_sec'] = done / elapsed
+                    summary['mb_per_sec'] = summary['bytes'] / elapsed / 1e6
+                    if progress:
+                        progress(summary)
+            span.set(imported=summary['imported'], skipped=summary['skipped'], failed=summary['failed'])
         
-        self.assign_btn.config(text="⌨ Assign Key")
-        self.refresh_soundboard_list()
+        self.update_cache_index(imported)
+        print(f"Import finished: {summary['imported']} imported, {summary['skipped']} skipped, "
+              f"{summary['failed']} failed, {summary['audio_seconds']:.0f}s of audio "
+              f"in {time.perf_counter() - started:.1f}s")
+        return summary
     
-    def wait_for_keypress(self):
-        """Wait for a single keypress and return the key"""
-        pressed_key = [None]
+    def assign_hotkey(self):
+        """Assign a hotkey to the selected sound (the next key pressed, without blocking the UI)"""
+        selection = self.sounds_listbox.curselection()
+        if not selection:
+            return
         
-        def on_press(key):
-            try:
-                # Handle special keys
-                if key == keyboard.Key.esc:
-                    pressed_key[0] = "esc"
-                elif hasattr(key, 'char') and key.char:
-                    pressed_key[0] = key.char.lower()
-                elif hasattr(key, 'name'):
-                    pressed_key[0] = key.name.lower()
-                else:
-                    pressed_key[0] = str(key).replace("Key.", "").lower()
-                return False  # Stop listener
-            except:
-                return False
+        filepath = self.sound_files[selection[0]]
+        
+        # The global listener hands the next key press to this capture
+        capture = {'file': filepath}
+        self.key_capture = capture
+        self.assign_btn.config(text="Press key...")
+        self.root.after(int(self.capture_timeout * 1000), lambda: self._capture_timed_out(capture))
+    
+    def _finish_key_capture(self, capture, pressed_key):
+        """Bind the captured key to the sound (ESC removes its binding)"""
+        filepath = capture['file']
         
-        # Create temporary listener
-        with keyboard.Listener(on_press=on_press) as listener:
-            listener.join()
+        # Build the new table aside and swap it in, so the listener never sees a half-edited one
+        bindings = {key: path for key, path in self.soundboard_bindings.items()
+                    if path != filepath and key != pressed_key}
+        if pressed_key != "esc":
+            bindings[pressed_key] = filepath
+        self.set_bindings(bindings)
         
-        return pressed_key[0]
+        self.assign_btn.config(text="⌨ Assign Key")
+    
+    def _capture_timed_out(self, capture):
+        """Give up waiting for a key; the existing binding is kept"""
+        if self.key_capture is not capture:
+            return
+        self.key_capture = None
+        print(f"No key pressed within {self.capture_timeout:.0f}s, binding unchanged")
+        self.assign_btn.config(text="⌨ Assign Key")
+    
+    def set_bindings(self, bindings):
+        """Replace the binding table (takes effect on the next key press) and save it"""
+        self.soundboard_bindings = bindings
+        self.save_soundboard()
+        self.refresh_soundboard_list()
+    
+    @staticmethod
+    def key_name(key):
+        """Return the binding name for a pynput key ("a", "f1", "esc", ...)"""
+        if hasattr(key, 'char') and key.char:
+            return key.char.lower()
+        elif hasattr(key, 'name'):
+            return key.name.lower()
+        return str(key).replace("Key.", "").lower()
     
     def remove_hotkey(self):
         """Remove hotkey from selected sound"""
@@ -632,44 +3626,28 @@ class TTSApp:
         if not selection:
             return
         
-        idx = selection[0]
-        display_name = self.sounds_listbox.get(idx)
-        
-        # Extract filename
-        if " [Key: " in display_name:
-            filename = display_name.split(" [Key: ")[0] + ".mp3"
-        else:
-            return  # No hotkey assigned
-        
-        filepath = os.path.join(self.cache_dir, filename)
+        filepath = self.sound_files[selection[0]]
         
         # Find and remove binding
-        to_remove = None
-        for key, path in self.soundboard_bindings.items():
-            if path == filepath:
-                to_remove = key
-                break
-        
-        if to_remove:
-            del self.soundboard_bindings[to_remove]
-            self.save_soundboard()
-            self.restart_hotkey_listener()
-            self.refresh_soundboard_list()
+        bindings = {key: path for key, path in self.soundboard_bindings.items() if path != filepath}
+        if len(bindings) != len(self.soundboard_bindings):
+            self.set_bindings(bindings)
     
     def start_hotkey_listener(self):
-        """Start global hotkey listener"""
+        """Start global hotkey listener (runs for the app's lifetime, reading the current table)"""
         def on_press(key):
             try:
-                key_str = None
-                if hasattr(key, 'char') and key.char:
-                    key_str = key.char.lower()
-                elif hasattr(key, 'name'):
-                    key_str = key.name.lower()
-                else:
-                    key_str = str(key).replace("Key.", "").lower()
+                key_str = self.key_name(key)
                 
-                if key_str in self.soundboard_bindings:
-                    filepath = self.soundboard_bindings[key_str]
+                # A pending key assignment takes this press instead of playing a sound
+                capture = self.key_capture
+                if capture is not None:
+                    self.key_capture = None
+                    self.root.after(0, lambda: self._finish_key_capture(capture, key_str))
+                    return
+                
+                filepath = self.soundboard_bindings.get(key_str)
+                if filepath:
                     threading.Thread(target=self.play_soundboard_sound, args=(filepath,), daemon=True).start()
             except:
                 pass
@@ -677,20 +3655,19 @@ class TTSApp:
         self.hotkey_listener = keyboard.Listener(on_press=on_press)
         self.hotkey_listener.start()
     
-    def restart_hotkey_listener(self):
-        """Restart the hotkey listener with new bindings"""
-        if self.hotkey_listener:
-            self.hotkey_listener.stop()
-        self.start_hotkey_listener()
-    
     def play_soundboard_sound(self, filepath):
         """Play a sound from the soundboard"""
         # Stop any currently playing sound
         self.stop_playback()
         
         self.is_playing = True
+        request_span = self.tracer.span('request', source='soundboard',
+                                        file=os.path.basename(filepath))
+        profile = self.profiler.section('soundboard')
         
         try:
+            profile.__enter__()
+            request_span.__enter__()
             # Get selected output devices
             device1_index = self.output1_dropdown.current()
             device2_index = self.output2_dropdown.current()
@@ -699,40 +3676,43 @@ class TTSApp:
             if device2_index > 0:
                 devices.append(device2_index - 1)
             
+            request_span.set(devices=devices)
+            
+            # Long sounds are streamed from disk in blocks
+            if self.should_stream(filepath):
+                duration = sf.info(filepath).duration
+                reader = self.player.stream_file(filepath, self.volume.get(), devices, join=False)
+                with self.tracer.span('playback', duration_s=round(duration, 3), streamed=True):
+                    reader.join()
+                    self.player.wait()
+                self._trace_first_sample(request_span)
+                return
+            
             # Load audio
-            data, sr = sf.read(filepath, dtype='float32')
+            with self.tracer.span('decode', file=os.path.basename(filepath)) as span:
+                data, sr, prepared = self.decode_clip(filepath, devices)
+                span.set(frames=len(data), samplerate=sr, prepared=sorted(prepared))
             
             # Apply volume with clipping
             import numpy as np
             volume_multiplier = self.volume.get()
             data = np.clip(data * volume_multiplier, -1.0, 1.0)
-            
-            # Ensure audio is mono for compatibility
-            if len(data.shape) > 1:
-                data = data.mean(axis=1)
+            prepared = {rate: np.clip(buf * volume_multiplier, -1.0, 1.0) for rate, buf in prepared.items()}
             
             # Play on all devices
-            for device_index in devices:
-                try:
-                    device_info = sd.query_devices(device_index)
-                    max_channels = device_info['max_output_channels']
-                    
-                    if max_channels == 1:
-                        output_data = data
-                    elif max_channels >= 2:
-                        output_data = np.column_stack([data, data])
-                    else:
-                        continue
-                    
-                    sd.play(output_data, sr, device=device_index)
-                except Exception as e:
-                    print(f"Error playing on device {device_index}: {e}")
+            self.player.play(data, sr, devices, prepared=prepared)
             
-            sd.wait()
+            with self.tracer.span('playback', duration_s=round(len(data) / sr, 3)):
+                self.player.wait()
+            
+            self._trace_first_sample(request_span)
             
         except Exception as e:
             print(f"Error playing soundboard sound: {e}")
+            request_span.set(error=f"{type(e).__name__}: {e}")
         finally:
+            request_span.__exit__(None, None, None)
+            profile.__exit__(None, None, None)
             self.is_playing = False
     
     def load_soundboard(self):
@@ -747,8 +3727,7 @@ class TTSApp:
     def save_soundboard(self):
         """Save soundboard bindings to file"""
         try:
-            with open(self.soundboard_file, 'w') as f:
-                json.dump(self.soundboard_bindings, f, indent=2)
+            atomic_write(self.soundboard_file, json.dumps(self.soundboard_bindings, indent=2).encode('utf-8'))
         except Exception as e:
             print(f"Error saving soundboard: {e}")
     
@@ -771,11 +3750,22 @@ class TTSApp:
             try:
                 config.read(self.config_file)
                 
-                # Load voice
-                if config.has_option('Settings', 'voice_index'):
+                # Load voice filters
+                if config.has_option('Settings', 'voice_locale'):
+                    locale = config.get('Settings', 'voice_locale')
+                    if locale == "All" or locale in self.voices_by_locale:
+                        self.locale_filter.set(locale)
+                if config.has_option('Settings', 'voice_gender'):
+                    self.gender_filter.set(config.get('Settings', 'voice_gender'))
+                self.filter_voices()
+                
+                # Load voice (older settings files stored an index into the built-in list)
+                if config.has_option('Settings', 'voice'):
+                    self.select_voice(config.get('Settings', 'voice'))
+                elif config.has_option('Settings', 'voice_index'):
                     voice_index = config.getint('Settings', 'voice_index')
                     if 0 <= voice_index < len(self.voices):
-                        self.voice_dropdown.current(voice_index)
+                        self.select_voice(self.voices[voice_index]['voice'])
                 
                 # Load output device 1
                 if config.has_option('Settings', 'output1_index'):
@@ -807,6 +3797,66 @@ class TTSApp:
                     stay_on_top = config.getboolean('Settings', 'stay_on_top')
                     self.stay_var.set(stay_on_top)
                     self.root.attributes('-topmost', stay_on_top)
+                
+                # Load tracing (the TTS_TRACE environment variable wins)
+                if config.has_option('Settings', 'tracing') and "TTS_TRACE" not in os.environ:
+                    self.tracing_var.set(config.getboolean('Settings', 'tracing'))
+                    self.tracer.enabled = self.tracing_var.get()
+                
+                # Load output stream tuning
+                if config.has_option('Settings', 'output_blocksize'):
+                    self.player.blocksize = config.getint('Settings', 'output_blocksize')
+                if config.has_option('Settings', 'output_latency'):
+                    latency = config.get('Settings', 'output_latency').strip().lower()
+                    if latency in ('low', 'high'):
+                        self.player.latency = latency
+                    elif latency and latency != 'default':
+                        self.player.latency = float(latency)
+                if config.has_option('Settings', 'audio_stats_interval'):
+                    self.audio_stats_interval = config.getfloat('Settings', 'audio_stats_interval')
+                if config.has_option('Settings', 'stream_threshold'):
+                    self.stream_threshold = config.getfloat('Settings', 'stream_threshold')
+                
+                # Load profiling (the TTS_PROFILE environment variable wins)
+                if config.has_option('Settings', 'profiling') and "TTS_PROFILE" not in os.environ:
+                    self.profiling_var.set(config.getboolean('Settings', 'profiling'))
+                if config.has_option('Settings', 'profile_interval'):
+                    self.profiler.interval = config.getfloat('Settings', 'profile_interval')
+                
+                # Load rate and pitch
+                if config.has_option('Settings', 'speech_rate'):
+                    rate_percent = config.getint('Settings', 'speech_rate')
+                    self.speech_rate = rate_percent / 100.0
+                    self.rate_slider.set(rate_percent)
+                    self.rate_value_label.config(text=f"{rate_percent}%")
+                if config.has_option('Settings', 'speech_pitch'):
+                    self.speech_pitch = config.getint('Settings', 'speech_pitch')
+                    self.pitch_slider.set(self.speech_pitch)
+                    self.pitch_value_label.config(text=f"{self.speech_pitch:+d} st")
+                
+                # Load backend limits
+                if config.has_option('Settings', 'backend_rate'):
+                    self.rate_limiter.rate = max(0.01, config.getfloat('Settings', 'backend_rate'))
+                if config.has_option('Settings', 'backend_burst'):
+                    self.rate_limiter.burst = max(1, config.getint('Settings', 'backend_burst'))
+                    self.rate_limiter.tokens = float(self.rate_limiter.burst)
+                if config.has_option('Settings', 'backend_retries'):
+                    self.backend_retries = max(0, config.getint('Settings', 'backend_retries'))
+                
+                # Load effects
+                if config.has_option('Settings', 'effects'):
+                    enabled = config.get('Settings', 'effects').replace(' ', '').split(',')
+                    for name, var in self.effect_vars.items():
+                        var.set(name in enabled)
+                if config.has_option('Settings', 'effects_output1'):
+                    self.fx_output1_var.set(config.getboolean('Settings', 'effects_output1'))
+                if config.has_option('Settings', 'effects_output2'):
+                    self.fx_output2_var.set(config.getboolean('Settings', 'effects_output2'))
+                for name, params in self.effect_params.items():
+                    for key, value in params.items():
+                        option = f"{name}_{key}"
+                        if config.has_option('Settings', option):
+                            params[key] = type(value)(config.get('Settings', option))
                     
             except Exception as e:
                 print(f"Error loading settings: {e}")
@@ -815,13 +3865,33 @@ class TTSApp:
         """Save settings to INI file"""
         config = configparser.ConfigParser()
         config['Settings'] = {
-            'voice_index': str(self.voice_dropdown.current()),
+            'voice': self.get_selected_voice(),
+            'voice_locale': self.locale_filter.get(),
+            'voice_gender': self.gender_filter.get(),
             'output1_index': str(self.output1_dropdown.current()),
             'output2_index': str(self.output2_dropdown.current()),
             'volume': str(self.volume_percent.get()),
+            'speech_rate': str(round(self.speech_rate * 100)),
+            'speech_pitch': str(self.speech_pitch),
             'dark_mode': str(self.dark_mode.get()),
-            'stay_on_top': str(self.stay_var.get())
+            'stay_on_top': str(self.stay_var.get()),
+            'tracing': str(self.tracing_var.get()),
+            'output_blocksize': str(self.player.blocksize),
+            'output_latency': str(self.player.latency if self.player.latency is not None else 'default'),
+            'audio_stats_interval': str(self.audio_stats_interval),
+            'stream_threshold': str(self.stream_threshold),
+            'profiling': str(self.profiling_var.get()),
+            'profile_interval': str(self.profiler.interval),
+            'backend_rate': str(self.rate_limiter.rate),
+            'backend_burst': str(self.rate_limiter.burst),
+            'backend_retries': str(self.backend_retries),
+            'effects': ",".join(name for name, var in self.effect_vars.items() if var.get()),
+            'effects_output1': str(self.fx_output1_var.get()),
+            'effects_output2': str(self.fx_output2_var.get())
         }
+        for name, params in self.effect_params.items():
+            for key, value in params.items():
+                config['Settings'][f"{name}_{key}"] = str(value)
         
         try:
             with open(self.config_file, 'w') as f:
@@ -840,6 +3910,12 @@ class TTSApp:
         for widget in self.main_widgets:
             if isinstance(widget, tk.Label):
                 widget.config(bg=colors['bg'], fg=colors['fg'])
+            elif isinstance(widget, tk.Listbox):
+                widget.config(
+                    bg=colors['entry_bg'],
+                    fg=colors['entry_fg'],
+                    selectbackground=colors['accent']
+                )
             elif isinstance(widget, tk.Text):
                 widget.config(
                     bg=colors['entry_bg'], 
@@ -908,6 +3984,35 @@ class TTSApp:
             elif isinstance(widget, tk.Frame):
                 widget.config(bg=colors['bg'])
         
+        # Stats frame widgets
+        self.stats_frame.config(bg=colors['bg'])
+        for widget in self.stats_widgets:
+            if isinstance(widget, tk.Label):
+                widget.config(bg=colors['bg'], fg=colors['fg'])
+            elif isinstance(widget, tk.Checkbutton):
+                widget.config(
+                    bg=colors['bg'],
+                    fg=colors['fg'],
+                    activebackground=colors['bg'],
+                    activeforeground=colors['fg'],
+                    selectcolor=colors['button_bg']
+                )
+            elif isinstance(widget, tk.Text):
+                widget.config(
+                    bg=colors['entry_bg'],
+                    fg=colors['entry_fg'],
+                    selectbackground=colors['accent']
+                )
+            elif isinstance(widget, tk.Button):
+                widget.config(
+                    bg=colors['button_bg'],
+                    fg=colors['button_fg'],
+                    activebackground=colors['hover'],
+                    activeforeground=colors['fg']
+                )
+            elif isinstance(widget, tk.Frame):
+                widget.config(bg=colors['bg'])
+        
         # Configure progress bar style
         style = ttk.Style()
         if self.dark_mode.get():
@@ -947,10 +4052,7 @@ class TTSApp:
         if not text:
             return
         
-        if self.is_playing:
-            return
-        
-        voice_index = self.voice_dropdown.current()
+        voice_name = self.get_selected_voice()
         device1_index = self.output1_dropdown.current()
         device2_index = self.output2_dropdown.current()
         
@@ -962,23 +4064,196 @@ class TTSApp:
         # Save settings when playing
         self.save_settings()
         
-        threading.Thread(target=self._tts_thread, args=(text, voice_index, devices), daemon=True).start()
+        self.enqueue_tts(text, voice_name, devices)
     
-    def _tts_thread(self, text, voice_index, device_indices):
-        self.is_playing = True
+    def enqueue_tts(self, text, voice_name, devices):
+        """Add a phrase to the playback queue"""
+        with self.queue_cond:
+            self.queue_counter += 1
+            item = {
+                'id': self.queue_counter,
+                'text': text,
+                'voice': voice_name,
+                'rate': self.speech_rate,
+                'pitch': self.speech_pitch,
+                'devices': list(devices),
+                'cancel': CancelToken(),
+                'enqueued': time.perf_counter()
+            }
+            self.tts_queue.append(item)
+            self.queue_cond.notify()
+            if self.queue_worker is None:
+                self.queue_worker = threading.Thread(target=self._queue_worker, daemon=True)
+                self.queue_worker.start()
+        return item
+    
+    def _queue_worker(self):
+        """Prepare queued items one ahead of playback and hand them to the player"""
+        while True:
+            # Keep at most one prepared item waiting behind the one playing
+            while self.player.is_queued(self.queued_ahead):
+                time.sleep(0.02)
+            
+            with self.queue_cond:
+                while not self.tts_queue:
+                    self.queue_cond.wait()
+                item = self.tts_queue.popleft()
+                self.preparing = item
+            
+            try:
+                with self.profiler.section('tts_thread'):
+                    self._tts_thread(item)
+            finally:
+                self.preparing = None
+    
+    def _wait_fed(self, cancel):
+        """Wait until a streamed clip has queued its last block, so a prepared item can follow it"""
+        while self.player.is_feeding():
+            if cancel.wait(0.02):
+                cancel.check()
+    
+    def skip_current(self):
+        """Skip the item playing now and go straight to the next one"""
+        tag, _ = self.player.current()
+        with self.queue_cond:
+            ahead = self.queued_ahead
+            self.queued_ahead = None
+            # The prepared next item goes back to the front of the queue
+            if ahead is not None and ahead is not tag:
+                self.tts_queue.appendleft(ahead)
+                self.queue_cond.notify()
+        self.player.stop()
+        self.progress_var.set(0)
+    
+    def clear_queue(self):
+        """Drop every item waiting in the queue (the current one keeps playing)"""
+        tag, _ = self.player.current()
+        with self.queue_cond:
+            ahead = self.queued_ahead if self.queued_ahead is not tag else None
+            for item in [self.preparing, ahead, *self.tts_queue]:
+                if item is not None:
+                    item['cancel'].cancel()
+            self.tts_queue.clear()
+            if ahead is not None:
+                self.queued_ahead = None
+        # The prepared item is already queued on the outputs
+        if ahead is not None:
+            self.player.discard(ahead)
+    
+    def _poll_playback(self):
+        """Update the progress bar and queue view from the player"""
+        try:
+            tag, fraction = self.player.current()
+            active = tag is not None or self.is_playing
+            if active:
+                self.progress_var.set(int(fraction * 100))
+            elif self._poll_active:
+                self.progress_var.set(0)
+            self._poll_active = active
+            
+            # The prepared item is no longer "ahead" once it plays (or playback ended)
+            if tag is not None and tag is self.queued_ahead:
+                self.queued_ahead = None
+            elif tag is None and not self.player.is_active():
+                self.queued_ahead = None
+            
+            with self.queue_cond:
+                waiting = list(self.tts_queue)
+            rows = []
+            if isinstance(tag, dict):
+                rows.append(f"▶ {tag['text'][:60]}")
+            for label, item in (("⏳", self.queued_ahead), ("⚙", self.preparing)):
+                if item is not None and item is not tag:
+                    rows.append(f"{label} {item['text'][:60]}")
+            rows.extend(f"• {item['text'][:60]}" for item in waiting)
+            
+            if rows != self._queue_view:
+                self._queue_view = rows
+                self.queue_listbox.delete(0, tk.END)
+                for row in rows:
+                    self.queue_listbox.insert(tk.END, row)
+        finally:
+            self.root.after(100, self._poll_playback)
+    
+    def cache_lines(self):
+        """Pre-synthesize every line of the text box as its own cached phrase"""
+        phrases = [line.strip() for line in self.text_box.get("1.0", tk.END).splitlines() if line.strip()]
+        if not phrases:
+            return
+        
+        voice_name = self.get_selected_voice()
+        self.batch_btn.config(state='disabled')
+        threading.Thread(target=self._cache_lines_thread, args=(phrases, voice_name), daemon=True).start()
+    
+    def _cache_lines_thread(self, phrases, voice_name):
+        def report(done, total):
+            self.progress_var.set(int(done / total * 100))
+        
+        started = time.perf_counter()
+        try:
+            self.generate_speech_batch(phrases, voice_name, report)
+            print(f"Cached {len(phrases)} phrases in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"Error during batch synthesis: {e}")
+        finally:
+            self.progress_var.set(0)
+            self.root.after(0, lambda: self.batch_btn.config(state='normal'))
+            self.root.after(0, self.refresh_soundboard_list)
+    
+    def _tts_thread(self, item):
+        """Synthesize and decode one queued item, then start it or queue it behind the current one"""
+        text = item['text']
+        device_indices = item['devices']
         audio_file = None
+        voice_name = item['voice']
+        request_span = self.tracer.span('request', source='tts', voice=voice_name,
+                                        text_len=len(text), devices=list(device_indices),
+                                        queue_ms=round((time.perf_counter() - item['enqueued']) * 1000, 3))
+        
+        cancel = item['cancel']
         
         try:
+            request_span.__enter__()
+            cancel.check()
             print(f"Starting TTS for: {text[:50]}...")
             
-            # Generate speech using edge-tts (with caching)
-            voice_name = self.voices[voice_index]['voice']
-            audio_file = self.generate_speech_edgetts(text, voice_name)
+            # Generate speech using edge-tts (with caching; long texts per sentence)
+            if self.should_segment(text):
+                audio_file = self.generate_speech_segmented(text, voice_name, cancel=cancel)
+            else:
+                audio_file = self.generate_speech_edgetts(text, voice_name, cancel=cancel)
+            cancel.check()
+            # Rate and pitch are applied locally, so every variant shares one synthesis
+            audio_file = self.get_variant_file(audio_file, item['rate'], item['pitch'], cancel=cancel)
+            cancel.check()
             
             print(f"Audio file ready: {audio_file}")
             
-            # Load audio file
-            data, sr = sf.read(audio_file, dtype='float32')
+            # Long clips are streamed from disk in blocks instead of decoded whole
+            if self.should_stream(audio_file):
+                item['duration'] = sf.info(audio_file).duration
+                self._wait_fed(cancel)
+                joined = self.player.devices == device_indices and self.player.is_active()
+                if not joined:
+                    self.player.wait()
+                    cancel.check()
+                print(f"Streaming {item['duration']:.1f}s clip on devices {device_indices}")
+                self.player.stream_file(audio_file, self.volume.get(), device_indices, item, cancel=cancel)
+                if cancel.cancelled:
+                    self.player.stop()
+                elif joined:
+                    self.queued_ahead = item
+                elif self.player.wait_started(timeout=2.0):
+                    self._trace_first_sample(request_span)
+                return
+            
+            # Load audio file (hot clips also come pre-rendered at the device rates)
+            with self.tracer.span('decode', file=os.path.basename(audio_file)) as span:
+                data, sr, prepared = self.decode_clip(audio_file, device_indices)
+                span.set(frames=len(data), samplerate=sr, prepared=sorted(prepared))
+            if self.is_fallback_file(audio_file):
+                os.remove(audio_file)
+            cancel.check()
             print(f"Audio loaded: {len(data)} samples at {sr}Hz, shape: {data.shape}")
             
             # Apply volume - ensure we're using the actual multiplier
@@ -988,66 +4263,176 @@ class TTSApp:
             
             # Clip to prevent distortion at high volumes
             data = np.clip(data * volume_multiplier, -1.0, 1.0)
+            prepared = {rate: np.clip(buf * volume_multiplier, -1.0, 1.0) for rate, buf in prepared.items()}
             
-            # Ensure audio is mono for compatibility
-            if len(data.shape) > 1:
-                data = data.mean(axis=1)
-            
-            # Calculate duration for progress bar
-            duration = len(data) / sr
-            
-            # Start playback on multiple devices
-            for device_index in device_indices:
-                try:
-                    print(f"Playing on device {device_index}")
-                    
-                    # Get device info
-                    device_info = sd.query_devices(device_index)
-                    max_channels = device_info['max_output_channels']
-                    
-                    # Prepare audio data for this device
-                    if max_channels == 1:
-                        output_data = data
-                    elif max_channels >= 2:
-                        output_data = np.column_stack([data, data])
-                    else:
-                        print(f"Warning: Device {device_index} has {max_channels} channels")
-                        continue
-                    
-                    sd.play(output_data, sr, device=device_index)
-                    
-                except Exception as device_error:
-                    print(f"Error playing on device {device_index}: {device_error}")
-            
-            # Update progress bar
-            self._update_progress(duration)
+            # Stop while preparing drops the item
+            cancel.check()
+            self._wait_fed(cancel)
             
-            # Wait for playback to finish
-            sd.wait()
-            print("Playback finished")
+            # Follow the current item without a gap when it's on the same devices
+            if (self.player.devices == device_indices and
+                    self.player.enqueue(data, sr, item, prepared=prepared)):
+                print(f"Queued behind current playback: {text[:50]}")
+                self.queued_ahead = item
+            else:
+                # Start playback on multiple devices
+                print(f"Playing on devices {device_indices}")
+                self.player.wait()
+                cancel.check()
+                self.player.play(data, sr, device_indices, item, prepared=prepared)
+                # Stop may have landed while the streams were opening
+                if cancel.cancelled:
+                    self.player.stop()
+                elif self.player.wait_started(timeout=2.0):
+                    self._trace_first_sample(request_span)
             
+        except Cancelled:
+            print(f"Cancelled: {text[:50]}")
+            request_span.set(cancelled=True)
+            # Stand-in voice clips are temp files; cache entries are complete and stay
+            if audio_file and self.is_fallback_file(audio_file) and os.path.exists(audio_file):
+                os.remove(audio_file)
+        except ServiceUnavailable as e:
+            print(f"Can't speak right now: {e}")
+            request_span.set(error=f"ServiceUnavailable: {e}")
         except Exception as e:
             print(f"Error during TTS playback: {e}")
             import traceback
             traceback.print_exc()
+            request_span.set(error=f"{type(e).__name__}: {e}")
         
         finally:
-            self.is_playing = False
-            self.progress_var.set(0)
+            request_span.__exit__(None, None, None)
+    
+    def decode_clip(self, audio_file, devices):
+        """Decode a clip to mono float32, plus {device rate: buffer} for pre-rendered variants"""
+        rates = set()
+        for device_index in devices:
+            try:
+                rates.add(self.player.device_rate(device_index))
+            except Exception as e:
+                print(f"Error querying device {device_index}: {e}")
+        
+        sr = sf.info(audio_file).samplerate
+        other_rates = rates - {sr}
+        prepared = {}
+        if other_rates and not self.is_fallback_file(audio_file):
+            prepared = self.load_native(audio_file, other_rates)
+            if len(prepared) == len(rates):
+                # Every device has its variant: the first one stands in for the source, which isn't decoded
+                rate = min(prepared)
+                return prepared.pop(rate), rate, prepared
+        
+        data, sr = sf.read(audio_file, dtype='float32')
+        if len(data.shape) > 1:
+            data = data.mean(axis=1)
+        if not other_rates or self.is_fallback_file(audio_file):
+            return data, sr, {}
+        
+        missing = other_rates - set(prepared)
+        if missing:
+            # Clips played often get rendered once at each missing rate, off the playback path
+            plays = self.play_counts.get(audio_file, 0) + 1
+            self.play_counts[audio_file] = plays
+            if plays >= self.native_after_plays:
+                self.play_counts[audio_file] = 0
+                threading.Thread(target=self.render_native, args=(audio_file, sorted(missing)),
+                                 daemon=True).start()
+        return data, sr, prepared
+    
+    def native_file(self, audio_file, rate):
+        """Return the path of a clip's pre-rendered variant at a device rate"""
+        folder = os.path.basename(os.path.dirname(os.path.abspath(audio_file)))
+        stem = os.path.splitext(os.path.basename(audio_file))[0]
+        return os.path.join(self.native_dir, f"{folder}-{stem}@{rate}.npy")
+    
+    def load_native(self, audio_file, rates):
+        """Load the up-to-date pre-rendered variants of a clip ({rate: buffer})"""
+        import numpy as np
+        
+        prepared = {}
+        for rate in rates:
+            path = self.native_file(audio_file, rate)
+            try:
+                if os.path.getmtime(path) >= os.path.getmtime(audio_file):
+                    prepared[rate] = np.load(path)
+            except OSError:
+                pass  # Not rendered yet
+            except Exception as e:
+                print(f"Discarding damaged clip variant {os.path.basename(path)}: {e}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return prepared
     
-    def _update_progress(self, duration):
-        steps = 50
-        step_duration = duration / steps
+    def render_native(self, audio_file, rates):
+        """Render a clip at each device rate with the high-quality resampler and keep it on disk"""
+        import numpy as np
         
-        for i in range(steps + 1):
-            if not self.is_playing:
-                break
-            self.progress_var.set(int((i / steps) * 100))
-            time.sleep(step_duration)
+        try:
+            data, sr = sf.read(audio_file, dtype='float32')
+            if len(data.shape) > 1:
+                data = data.mean(axis=1)
+            for rate in rates:
+                path = self.native_file(audio_file, rate)
+                with self.cache_lock(path):
+                    if self.load_native(audio_file, [rate]):
+                        continue  # Another instance rendered it
+                    with self.tracer.span('render_native', file=os.path.basename(audio_file),
+                                          rate_in=sr, rate_out=rate):
+                        rendered = resample(data, sr, rate, zero_crossings=32)
+                    with atomic_path(path) as temp_path:
+                        with open(temp_path, 'wb') as f:
+                            np.save(f, rendered)
+                print(f"Pre-rendered {os.path.basename(audio_file)} at {rate} Hz")
+        except Exception as e:
+            print(f"Error pre-rendering {audio_file}: {e}")
+    
+    def should_stream(self, audio_file):
+        """Check whether a clip is long enough to stream instead of decoding it whole"""
+        if self.is_fallback_file(audio_file):
+            return False
+        try:
+            return sf.info(audio_file).duration > self.stream_threshold
+        except Exception as e:
+            print(f"Error reading audio info: {e}")
+            return False
+    
+    def effects_for_device(self, device_index):
+        """Return the effects to apply on a device (outputs without effects stay dry)"""
+        enabled = [name for name, var in self.effect_vars.items() if var.get()]
+        if not enabled:
+            return []
+        if self.fx_output1_var.get() and device_index == self.output1_dropdown.current():
+            return enabled
+        output2 = self.output2_dropdown.current() - 1
+        if self.fx_output2_var.get() and output2 >= 0 and device_index == output2:
+            return enabled
+        return []
+    
+    def _trace_first_sample(self, request_span):
+        """Record time from request start until the first sample reaches the DAC"""
+        if request_span is NULL_SPAN:
+            return
+        first_sample = self.player.first_sample_time()
+        if first_sample is None:
+            return
+        first_sample_ms = (first_sample - request_span.start) * 1000.0
+        request_span.set(first_sample_ms=round(first_sample_ms, 3))
+        self.tracer.record('first_sample', first_sample_ms, trace=request_span.trace_id,
+                           parent=request_span.name)
     
     def stop_playback(self):
         self.is_playing = False
-        sd.stop()
+        with self.queue_cond:
+            # Abort whatever is being synthesized or decoded and everything still waiting
+            for item in [self.preparing, self.queued_ahead, *self.tts_queue]:
+                if item is not None:
+                    item['cancel'].cancel()
+            self.tts_queue.clear()
+            self.queued_ahead = None
+        self.player.stop()
         self.progress_var.set(0)
     
     def open_options(self):
@@ -1067,6 +4452,8 @@ class TTSApp:
         if self.hotkey_listener:
             self.hotkey_listener.stop()
         
+        self.tracer.close()
+        self.profiler.stop()
         self.root.destroy()
 
 if __name__ == "__main__":